@@ -1,83 +1,636 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from transformers import BertTokenizer, BertForSequenceClassification
 from transformers import RobertaTokenizer, RobertaForSequenceClassification
+from transformers import AutoTokenizer, DistilBertForSequenceClassification, AutoModelForSequenceClassification
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
 import torch
+import numpy as np
 import pandas as pd
 
+import config
+from batching import MicroBatcher
+from prediction_cache import PredictionCache
+from quantization import load_quantized_model
+from stage_timing import stage
+from structured_logging import REQUEST_LOGGER_NAME, setup_logging
+from search_index import SearchIndex
+from verse_corpus import load_verse_corpus
+from verse_lookup import CONTENT_TYPE as VERSE_CONTENT_TYPE, VerseLookup
+from verse_index import COLUMNS as VERSE_COLUMNS, NO_VERSE_FOUND, VerseIndex, format_verse
+from verse_store import open_store
+from worker_pool import BoundedWorkerPool, DeadlineExceeded, QueueFull
+
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load the fine-tuned BERT model and tokenizer
-bert_model = BertForSequenceClassification.from_pretrained("./model/emotion_bert_model_1", num_labels=4)
-bert_tokenizer = BertTokenizer.from_pretrained("./model/emotion_bert_tokenizer_1")
+# Structured logging and, when enabled, Prometheus metrics
+setup_logging(config.LOG_LEVEL, config.LOG_SAMPLE_RATE)
+logger = logging.getLogger("quranjar.app")
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+metrics = None
+if config.METRICS:
+    import metrics
 
-# Load the pre-trained RoBERTa model and tokenizer
-roberta_model = RobertaForSequenceClassification.from_pretrained("./model/emotion_roberta_model_1", num_labels=4)
-roberta_tokenizer = RobertaTokenizer.from_pretrained("./model/emotion_roberta_tokenizer_1")
+# Torch thread pools, set before any model runs (the inter-op pool cannot change after that)
+if config.INTEROP_THREADS:
+    torch.set_num_interop_threads(config.INTEROP_THREADS)
+if config.NUM_THREADS:
+    torch.set_num_threads(config.NUM_THREADS)
+# Intra-op threads of the request threads, restored after every parallel ensemble member run
+REQUEST_NUM_THREADS = torch.get_num_threads()
+if config.PROFILE is not None:
+    logger.info("Serving profile loaded from '%s'", config.PROFILE_PATH, extra={"fields": {"settings": config.PROFILE["settings"]}})
+    if config.PROFILE["host"]["cpu_count"] != os.cpu_count():
+        logger.warning(
+            "Serving profile was tuned on a host with %d cores, this one has %d; rerun autotune.py",
+            config.PROFILE["host"]["cpu_count"], os.cpu_count(),
+        )
+
+# Function to load a fine-tuned model for the configured backend
+def load_model(model_class, model_dir):
+    if config.BACKEND == "onnx":
+        from onnx_backend import OnnxSequenceClassifier, make_session_options
+        from export_onnx import onnx_path
+        session_options = make_session_options(
+            intra_op_threads=config.ONNX_INTRA_OP_THREADS,
+            inter_op_threads=config.ONNX_INTER_OP_THREADS,
+            execution_mode=config.ONNX_EXECUTION_MODE,
+            graph_optimization=config.ONNX_GRAPH_OPTIMIZATION,
+        )
+        if not os.path.exists(onnx_path(model_dir)):
+            raise FileNotFoundError(f"No ONNX export of '{model_dir}'; run `python export_onnx.py` first")
+        return OnnxSequenceClassifier(onnx_path(model_dir), session_options)
+    if config.BACKEND != "torch":
+        raise ValueError(f"Unknown inference backend: {config.BACKEND}")
+    if config.QUANTIZE:
+        return load_quantized_model(model_class, model_dir, num_labels=4)
+    return model_class.from_pretrained(model_dir, num_labels=4)
 
 # Load the label map
 label_map = {"anger": 0, "fear": 1, "joy": 2, "sadness": 3}
+label_names = np.array(sorted(label_map, key=label_map.get))
 
 # Load the dataset containing Quranic verses and emotions
 def load_quran_dataset(file_path):
     df = pd.read_csv(file_path)
     return df
 
-quran_df = load_quran_dataset("./dataset/quran_emotions_cleaned_2.csv")
+VERSES_PATH = "./dataset/quran_emotions_cleaned_2.csv"
 
-# Function to classify emotion using BERT
-def classify_emotion_bert(user_input):
-    encoding = bert_tokenizer.encode_plus(
-        user_input,
-        add_special_tokens=True,
-        max_length=128,
-        return_token_type_ids=False,
-        padding="max_length",
-        truncation=True,
-        return_attention_mask=True,
-        return_tensors="pt",
-    )
-    with torch.no_grad():
-        output = bert_model(encoding["input_ids"], attention_mask=encoding["attention_mask"])
+# Models, tokenizers and the verse dataset are set by load_resources(), either at
+# import time or, with LAZY_LOADING, in a background thread after the server binds
+bert_model = None
+bert_tokenizer = None
+roberta_model = None
+roberta_tokenizer = None
+distilbert_model = None
+distilbert_tokenizer = None
+student_model = None
+student_tokenizer = None
+quran_df = None  # a VerseStore when the verse store is used
+verse_index = None
+
+# The full verse corpus and its preformatted verses, the /search index and, for
+# semantic verse retrieval (VERSE_RETRIEVAL="semantic"), the embedding index and
+# the query embedder
+verse_corpus = None
+corpus_verses = None
+search_index = None
+semantic_index = None
+verse_lookup = None
+text_embedder = None
+
+# Startup state reported by /ready
+_process_start = time.perf_counter()
+ready_event = threading.Event()
+startup_error = None
+load_timings = {}
+
+# Function to run one startup phase and log how long it took
+def _timed(phase, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    load_timings[phase] = time.perf_counter() - start
+    if metrics is not None:
+        metrics.observe_load(phase, load_timings[phase])
+    logger.info(f"Startup: {phase} took {load_timings[phase]:.2f}s", extra={"fields": {"phase": phase, "seconds": load_timings[phase]}})
+    return result
+
+# Load the fine-tuned BERT model and tokenizer
+def _load_bert():
+    model = load_model(BertForSequenceClassification, "./model/emotion_bert_model_1")
+    tokenizer = BertTokenizer.from_pretrained("./model/emotion_bert_tokenizer_1")
+    return model, tokenizer
+
+# Load the pre-trained RoBERTa model and tokenizer
+def _load_roberta():
+    model = load_model(RobertaForSequenceClassification, "./model/emotion_roberta_model_1")
+    tokenizer = RobertaTokenizer.from_pretrained("./model/emotion_roberta_tokenizer_1")
+    return model, tokenizer
+
+# Load the fine-tuned DistilBERT model and tokenizer used as the first stage of the cascade
+def _load_distilbert():
+    model = load_model(DistilBertForSequenceClassification, "./model/emotion_distilbert_model_1")
+    tokenizer = AutoTokenizer.from_pretrained("./model/emotion_distilbert_tokenizer_1")
+    return model, tokenizer
+
+# Load the student distilled from the ensemble by train_distill.py
+def _load_student():
+    model = load_model(AutoModelForSequenceClassification, config.STUDENT_MODEL_DIR)
+    tokenizer = AutoTokenizer.from_pretrained(config.STUDENT_TOKENIZER_DIR)
+    return model, tokenizer
+
+# Load the verses and build the per-emotion index of preformatted verses. The
+# columns the index needs are memory-mapped from the verse store when it is
+# built; otherwise the whole CSV is parsed into a DataFrame.
+def _load_verses():
+    store = open_store(VERSES_PATH, VERSE_COLUMNS, config.VERSE_STORE_DIR) if config.VERSE_STORE else None
+    if store is None:
+        df = load_quran_dataset(VERSES_PATH)
+        return df, VerseIndex.from_dataframe(df)
+    return store, VerseIndex.from_store(store)
+
+# Load the full verse corpus and preformat its verses
+def _load_corpus():
+    corpus = load_verse_corpus(store_dir=config.VERSE_STORE_DIR if config.VERSE_STORE else None)
+    columns = ["ayah_ar", "ayah_en", "surah_name_roman", "surah_name_en", "ayah_no_surah"]
+    verses = tuple(format_verse(*details) for details in corpus[columns].itertuples(index=False, name=None))
+    return corpus, verses
+
+# Load the memory-mapped embedding index of the corpus and the query embedder
+def _load_semantic(corpus):
+    from semantic_index import SemanticIndex, TextEmbedder, corpus_hash
+
+    index = SemanticIndex.load(config.SEMANTIC_INDEX_DIR, labels=corpus["labels"].tolist())
+    keys = corpus[["surah_no", "ayah_no_surah"]].values.tolist()
+    if index.meta["corpus_hash"] != corpus_hash(keys, corpus["ayah_en"].tolist()):
+        raise ValueError(f"Semantic index in '{config.SEMANTIC_INDEX_DIR}' does not match the verse corpus; rebuild it with `python semantic_index.py`")
+    if index.meta["model"] != config.SEMANTIC_MODEL:
+        raise ValueError(f"Semantic index was built with {index.meta['model']}, not {config.SEMANTIC_MODEL}")
+    return index, TextEmbedder(config.SEMANTIC_MODEL)
+
+# Load the corpus and build the indexes over it that are enabled
+def _load_corpus_indexes():
+    corpus, verses = _timed("load_corpus", _load_corpus)
+    index = _timed("build_search_index", SearchIndex.from_corpus, corpus) if config.SEARCH else None
+    semantic = _timed("load_semantic_index", _load_semantic, corpus) if config.VERSE_RETRIEVAL == "semantic" else (None, None)
+    lookup = _timed("build_verse_lookup", VerseLookup.from_corpus, corpus, verses, config.VERSE_MAX_AGE_SECONDS) if config.VERSE_LOOKUP else None
+    return corpus, verses, index, *semantic, lookup
+
+# Function to load the models and the verse dataset in parallel
+def load_resources():
+    global bert_model, bert_tokenizer, roberta_model, roberta_tokenizer, quran_df, verse_index
+    global distilbert_model, distilbert_tokenizer, student_model, student_tokenizer
+    global verse_corpus, corpus_verses, search_index, semantic_index, text_embedder, verse_lookup
+    if config.VERSE_RETRIEVAL not in ("random", "semantic"):
+        raise ValueError(f"Unknown verse retrieval mode: {config.VERSE_RETRIEVAL}")
+    with ThreadPoolExecutor(max_workers=5, thread_name_prefix="loader") as executor:
+        verses_future = executor.submit(_timed, "load_verses", _load_verses)
+        corpus_future = None
+        if config.SEARCH or config.VERSE_RETRIEVAL == "semantic" or config.VERSE_LOOKUP:
+            corpus_future = executor.submit(_load_corpus_indexes)
+        if config.STUDENT:
+            # The student replaces the ensemble, so BERT and RoBERTa are not loaded
+            student_future = executor.submit(_timed, "load_student", _load_student)
+            student_model, student_tokenizer = student_future.result()
+        else:
+            bert_future = executor.submit(_timed, "load_bert", _load_bert)
+            roberta_future = executor.submit(_timed, "load_roberta", _load_roberta)
+            if config.CASCADE:
+                distilbert_future = executor.submit(_timed, "load_distilbert", _load_distilbert)
+                distilbert_model, distilbert_tokenizer = distilbert_future.result()
+            bert_model, bert_tokenizer = bert_future.result()
+            roberta_model, roberta_tokenizer = roberta_future.result()
+        quran_df, verse_index = verses_future.result()
+        if corpus_future is not None:
+            verse_corpus, corpus_verses, search_index, semantic_index, text_embedder, verse_lookup = corpus_future.result()
+
+# Longest sequence the models were fine-tuned on
+MAX_LENGTH = 128
+
+# Function to run one model over an encoded batch and return softmax probabilities
+def _forward_probabilities(model, encoding, name=None):
+    with stage("forward", name), torch.no_grad():
+        output = model(encoding["input_ids"], attention_mask=encoding["attention_mask"])
     logits = output.logits
-    probabilities = torch.softmax(logits, dim=1).numpy()[0]
+    probabilities = torch.softmax(logits, dim=1).numpy()
     return probabilities
 
+# Function to split batch positions into groups of similar token length
+def _length_groups(lengths):
+    if not config.LENGTH_BUCKETS:
+        return [np.arange(len(lengths))]
+    bucket_ids = np.searchsorted(config.LENGTH_BUCKETS, lengths)
+    return [np.flatnonzero(bucket_ids == bucket_id) for bucket_id in np.unique(bucket_ids)]
+
+# Function to classify a batch of texts with one model, returning one row of probabilities per text.
+# With dynamic padding each length group is padded only to its longest sequence; padded positions
+# are masked out, so the probabilities match the max_length path up to float rounding.
+# `name` labels the model in the per-stage timings.
+def classify_emotion_batch(model, tokenizer, user_inputs, name=None):
+    user_inputs = list(user_inputs)
+    if config.PADDING_STRATEGY == "max_length":
+        with stage("tokenize", name):
+            encoding = tokenizer(
+                user_inputs,
+                add_special_tokens=True,
+                max_length=MAX_LENGTH,
+                return_token_type_ids=False,
+                padding="max_length",
+                truncation=True,
+                return_attention_mask=True,
+                return_tensors="pt",
+            )
+        return _forward_probabilities(model, encoding, name)
+
+    with stage("tokenize", name):
+        encoding = tokenizer(
+            user_inputs,
+            add_special_tokens=True,
+            max_length=MAX_LENGTH,
+            return_token_type_ids=False,
+            truncation=True,
+            return_attention_mask=True,
+        )
+    lengths = np.array([len(input_ids) for input_ids in encoding["input_ids"]])
+    probabilities = np.empty((len(user_inputs), len(label_map)), dtype=np.float32)
+    for positions in _length_groups(lengths):
+        with stage("tokenize", name):
+            group = tokenizer.pad(
+                {
+                    "input_ids": [encoding["input_ids"][i] for i in positions],
+                    "attention_mask": [encoding["attention_mask"][i] for i in positions],
+                },
+                padding="longest",
+                return_tensors="pt",
+            )
+        probabilities[positions] = _forward_probabilities(model, group, name)
+    return probabilities
+
+# Function to classify a batch of texts using BERT
+def classify_emotion_bert_batch(user_inputs):
+    return classify_emotion_batch(bert_model, bert_tokenizer, user_inputs, "bert")
+
+# Function to classify a batch of texts using RoBERTa
+def classify_emotion_roberta_batch(user_inputs):
+    return classify_emotion_batch(roberta_model, roberta_tokenizer, user_inputs, "roberta")
+
+# Function to classify emotion using BERT
+def classify_emotion_bert(user_input):
+    return classify_emotion_bert_batch([user_input])[0]
+
 # Function to classify emotion using RoBERTa
 def classify_emotion_roberta(user_input):
-    encoding = roberta_tokenizer.encode_plus(
-        user_input,
-        add_special_tokens=True,
-        max_length=128,
-        return_token_type_ids=False,
-        padding="max_length",
-        truncation=True,
-        return_attention_mask=True,
-        return_tensors="pt",
-    )
-    with torch.no_grad():
-        output = roberta_model(encoding["input_ids"], attention_mask=encoding["attention_mask"])
-    logits = output.logits
-    probabilities = torch.softmax(logits, dim=1).numpy()[0]
-    return probabilities
+    return classify_emotion_roberta_batch([user_input])[0]
+
+# Dedicated single-thread executors for the ensemble members, so both models can
+# run at the same time. They are created on first use (and again in a forked
+# child, where the parent's threads no longer exist).
+_member_executors = None
+_member_executors_pid = None
+_member_thread_state = threading.local()
+
+def get_member_executors():
+    global _member_executors, _member_executors_pid
+    if _member_executors is None or _member_executors_pid != os.getpid():
+        _member_executors = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="bert"),
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="roberta"),
+        )
+        _member_executors_pid = os.getpid()
+    return _member_executors
+
+# Function to run one ensemble member on its executor with its share of the intra-op threads.
+# torch.set_num_threads is not a per-thread setting, so the count is set right before
+# the forward call and put back to REQUEST_NUM_THREADS afterwards (see BERT_NUM_THREADS in config.py).
+def _run_member(name, classify_batch, num_threads, user_inputs):
+    torch.set_num_threads(num_threads)
+    try:
+        if not getattr(_member_thread_state, "logged", False):
+            _member_thread_state.logged = True
+            logger.info(
+                "Ensemble member %s runs with %d intra-op threads", name, torch.get_num_threads(),
+                extra={"fields": {"member": name, "num_threads": torch.get_num_threads()}},
+            )
+        return classify_batch(user_inputs)
+    finally:
+        torch.set_num_threads(REQUEST_NUM_THREADS)
+
+# Function to get both ensemble members' probabilities, either one after the other or concurrently
+def classify_emotion_members_batch(user_inputs, parallel=None):
+    if parallel is None:
+        parallel = config.ENSEMBLE_EXECUTION == "parallel"
+    if not parallel:
+        return classify_emotion_bert_batch(user_inputs), classify_emotion_roberta_batch(user_inputs)
+    bert_executor, roberta_executor = get_member_executors()
+    bert_future = bert_executor.submit(_run_member, "bert", classify_emotion_bert_batch, config.BERT_NUM_THREADS, user_inputs)
+    roberta_future = roberta_executor.submit(_run_member, "roberta", classify_emotion_roberta_batch, config.ROBERTA_NUM_THREADS, user_inputs)
+    return bert_future.result(), roberta_future.result()
+
+# Ensemble function for a batch of texts: one forward pass per model for the whole batch
+def classify_emotion_ensemble_batch(user_inputs, parallel=None):
+    bert_probabilities, roberta_probabilities = classify_emotion_members_batch(user_inputs, parallel)
+    with stage("ensemble"):
+        combined_probabilities = (bert_probabilities + roberta_probabilities) / 2
+        predicted_labels = label_names[combined_probabilities.argmax(axis=1)]
+    return predicted_labels.tolist(), combined_probabilities
 
 # Ensemble function to combine predictions
-def classify_emotion_ensemble(user_input):
-    bert_probabilities = classify_emotion_bert(user_input)
-    roberta_probabilities = classify_emotion_roberta(user_input)
-    combined_probabilities = (bert_probabilities + roberta_probabilities) / 2
-    predicted_label_id = combined_probabilities.argmax()
-    predicted_label = list(label_map.keys())[list(label_map.values()).index(predicted_label_id)]
-    return predicted_label, combined_probabilities
+def classify_emotion_ensemble(user_input, parallel=None):
+    predicted_labels, combined_probabilities = classify_emotion_ensemble_batch([user_input], parallel)
+    return predicted_labels[0], combined_probabilities[0]
+
+# Function to classify a batch of texts using DistilBERT
+def classify_emotion_distilbert_batch(user_inputs):
+    return classify_emotion_batch(distilbert_model, distilbert_tokenizer, user_inputs, "distilbert")
+
+# Function to find the cascade predictions confident enough to skip the ensemble, by
+# top probability or by the margin between the two most likely emotions
+def cascade_confident(probabilities, threshold=None, criterion=None):
+    threshold = config.CASCADE_THRESHOLD if threshold is None else threshold
+    criterion = config.CASCADE_CRITERION if criterion is None else criterion
+    top_two = np.sort(probabilities, axis=1)[:, -2:]
+    if criterion == "margin":
+        scores = top_two[:, 1] - top_two[:, 0]
+    elif criterion == "probability":
+        scores = top_two[:, 1]
+    else:
+        raise ValueError(f"Unknown cascade criterion: {criterion}")
+    return scores >= threshold
+
+# Escalation counters for the cascade, reported on /stats and logged periodically
+cascade_lock = threading.Lock()
+cascade_stats = {"requests": 0, "escalations": 0}
+
+# Cascade function: DistilBERT first, the full ensemble only for the uncertain inputs
+def classify_emotion_cascade_batch(user_inputs):
+    user_inputs = list(user_inputs)
+    probabilities = classify_emotion_distilbert_batch(user_inputs)
+    escalated = np.flatnonzero(~cascade_confident(probabilities))
+    if escalated.size:
+        _, ensemble_probabilities = classify_emotion_ensemble_batch([user_inputs[i] for i in escalated])
+        probabilities[escalated] = ensemble_probabilities
+
+    with cascade_lock:
+        previous_requests = cascade_stats["requests"]
+        cascade_stats["requests"] += len(user_inputs)
+        cascade_stats["escalations"] += int(escalated.size)
+        requests, escalations = cascade_stats["requests"], cascade_stats["escalations"]
+    if requests // config.CASCADE_LOG_INTERVAL > previous_requests // config.CASCADE_LOG_INTERVAL:
+        logger.info(
+            f"Cascade: escalated {escalations}/{requests} requests ({escalations / requests:.1%}) to the ensemble",
+            extra={"fields": {"requests": requests, "escalations": escalations}},
+        )
+
+    predicted_labels = label_names[probabilities.argmax(axis=1)]
+    return predicted_labels.tolist(), probabilities
+
+# Function to classify a batch of texts using the distilled student
+def classify_emotion_student_batch(user_inputs):
+    probabilities = classify_emotion_batch(student_model, student_tokenizer, user_inputs, "student")
+    predicted_labels = label_names[probabilities.argmax(axis=1)]
+    return predicted_labels.tolist(), probabilities
+
+# Function to classify a batch of texts with the configured serving mode (ensemble, cascade or student)
+def classify_emotion_serving_batch(user_inputs):
+    if config.STUDENT:
+        return classify_emotion_student_batch(user_inputs)
+    if config.CASCADE:
+        return classify_emotion_cascade_batch(user_inputs)
+    return classify_emotion_ensemble_batch(user_inputs)
+
+# Function to classify one text with the configured serving mode
+def classify_emotion_serving(user_input):
+    predicted_labels, probabilities = classify_emotion_serving_batch([user_input])
+    return predicted_labels[0], probabilities[0]
+
+# Function to run the models once per warmup sequence length, so the first real
+# request does not pay for lazy kernel initialization
+def warmup():
+    for length in config.WARMUP_LENGTHS:
+        # "peace" is a single token for both tokenizers; two more are special tokens
+        text = " ".join(["peace"] * max(1, length - 2))
+        classify_emotion_serving_batch([text])
+        if config.CASCADE and not config.STUDENT:
+            classify_emotion_ensemble_batch([text])
+        if semantic_index is not None:
+            get_semantic_verses_batch([text], ["joy"])
+    # The warmup inputs are not traffic; start the cascade counters from zero
+    with cascade_lock:
+        cascade_stats.update(requests=0, escalations=0)
+
+# Function to load resources, warm up the models and mark the service ready
+def start():
+    global startup_error
+    try:
+        _timed("load", load_resources)
+        if config.WARMUP_LENGTHS:
+            _timed("warmup", warmup)
+    except Exception as exc:
+        startup_error = f"{type(exc).__name__}: {exc}"
+        logger.exception(f"Startup failed: {startup_error}")
+        raise
+    load_timings["time_to_ready"] = time.perf_counter() - _process_start
+    if metrics is not None:
+        metrics.observe_load("time_to_ready", load_timings["time_to_ready"])
+    logger.info(f"Startup: ready after {load_timings['time_to_ready']:.2f}s", extra={"fields": {"seconds": load_timings["time_to_ready"]}})
+    ready_event.set()
+
+# Micro-batching scheduler: concurrent /predict calls share one forward pass per model
+def _predict_micro_batch(user_inputs):
+    predicted_labels, combined_probabilities = classify_emotion_serving_batch(user_inputs)
+    return list(zip(predicted_labels, combined_probabilities))
+
+micro_batcher = None
+if config.MICRO_BATCHING:
+    micro_batcher = MicroBatcher(
+        _predict_micro_batch,
+        max_batch_size=config.MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=config.MICRO_BATCH_MAX_WAIT_MS,
+    )
+
+# Prediction cache: repeated inputs skip inference, concurrent identical inputs share one computation
+prediction_cache = None
+if config.PREDICTION_CACHE:
+    prediction_cache = PredictionCache(
+        max_entries=config.PREDICTION_CACHE_MAX_ENTRIES,
+        max_bytes=config.PREDICTION_CACHE_MAX_BYTES,
+        ttl_seconds=config.PREDICTION_CACHE_TTL_SECONDS,
+        case_insensitive=config.PREDICTION_CACHE_CASE_INSENSITIVE,
+    )
+
+# Async serving: inference runs on a dedicated worker pool behind a bounded queue,
+# while the request threads only parse, wait and respond
+def _run_inference(job):
+    fn, args, deadline = job
+    return fn(*args, deadline=deadline)
+
+inference_pool = None
+if config.ASYNC_SERVING:
+    # With micro-batching the pool threads wait on the batcher, which runs the models;
+    # a batch can only fill up if as many requests can wait at once
+    async_workers = config.ASYNC_WORKERS
+    if config.MICRO_BATCHING:
+        async_workers = max(async_workers, config.MICRO_BATCH_MAX_SIZE)
+    inference_pool = BoundedWorkerPool(
+        _run_inference,
+        workers=async_workers,
+        max_queue_size=config.ASYNC_QUEUE_SIZE,
+    )
+
+# Function to get the deadline of the current request as a time.monotonic() value, or None
+def request_deadline():
+    timeout_ms = config.REQUEST_TIMEOUT_MS
+    header = request.headers.get("X-Request-Timeout-Ms")
+    if header:
+        try:
+            requested_ms = float(header)
+        except ValueError:
+            requested_ms = None
+        if requested_ms is not None and requested_ms > 0:
+            timeout_ms = min(timeout_ms, requested_ms) if timeout_ms > 0 else requested_ms
+    if timeout_ms <= 0:
+        return None
+    return time.monotonic() + timeout_ms / 1000.0
+
+# Function to run `fn(*args)` on the worker pool in async mode, or directly otherwise. In
+# async mode `fn` also gets the request deadline as its `deadline` keyword.
+def run_inference(fn, *args):
+    if inference_pool is None:
+        return fn(*args)
+    deadline = request_deadline()
+    return inference_pool((fn, args, deadline), deadline)
+
+# Function to predict the emotion of one input through the cache and micro-batcher when enabled.
+# The micro-batcher drops the input instead of running it once `deadline` has passed.
+def predict_emotion(user_input, deadline=None):
+    classify = classify_emotion_serving
+    if micro_batcher is not None:
+        classify = lambda text: micro_batcher(text, deadline=deadline)
+    if prediction_cache is not None:
+        return prediction_cache.get_or_compute(user_input, classify)
+    return classify(user_input)
 
 # Function to get a Quranic verse based on the predicted emotion
-def get_quranic_verse(predicted_emotion, df):
-    filtered_verses = df[df['label'] == predicted_emotion]
-    if filtered_verses.empty:
-        return "No verse found for the predicted emotion."
-    selected_row = filtered_verses.sample(n=1).iloc[0]
-    verse_with_details = f"{selected_row['ayah_ar']}\n{selected_row['ayah_en']} (Surah {selected_row['surah_name_roman']}: {selected_row['surah_name_en']}, Verse {selected_row['ayah_no_surah']})"
-    return verse_with_details
+def get_quranic_verse(predicted_emotion, index):
+    with stage("verse_lookup"):
+        verse = index.sample(predicted_emotion)
+    if verse is None:
+        return NO_VERSE_FOUND
+    return verse
+
+# Function to get one Quranic verse per predicted emotion
+def get_quranic_verses(predicted_emotions, index):
+    return [get_quranic_verse(predicted_emotion, index) for predicted_emotion in predicted_emotions]
+
+# Function to find the verses closest in meaning to each text (one embedding pass for all
+# texts), restricted to the text's predicted emotion when SEMANTIC_FILTER_BY_EMOTION is set
+def get_semantic_verses_batch(user_inputs, predicted_emotions, k=None):
+    k = config.SEMANTIC_TOP_K if k is None else k
+    with stage("embed_query"):
+        queries = text_embedder.embed(user_inputs)
+    results = []
+    with stage("verse_lookup"):
+        for query, predicted_emotion in zip(queries, predicted_emotions):
+            label = predicted_emotion if config.SEMANTIC_FILTER_BY_EMOTION else None
+            rows, scores = semantic_index.search(query, k, label=label)
+            results.append([
+                {
+                    "surah_no": int(semantic_index.keys[row][0]),
+                    "ayah_no_surah": int(semantic_index.keys[row][1]),
+                    "verse": corpus_verses[row],
+                    "score": float(score),
+                }
+                for row, score in zip(rows, scores)
+            ])
+    return results
+
+# Function to pick the verse of a prediction: the closest one in semantic mode, otherwise a random
+# verse of the emotion. Returns the verse and, in semantic mode, the ranked related verses.
+def select_verses(user_inputs, predicted_emotions):
+    if semantic_index is None:
+        return get_quranic_verses(predicted_emotions, verse_index), [None] * len(user_inputs)
+    related = get_semantic_verses_batch(user_inputs, predicted_emotions)
+    verses = [matches[0]["verse"] if matches else NO_VERSE_FOUND for matches in related]
+    return verses, related
+
+# Function to predict the emotion and pick the verse of one input; a single inference job,
+# so a request passes the async queue once. `related` is None outside semantic mode.
+def predict_one(user_input, deadline=None):
+    predicted_emotion, probabilities = predict_emotion(user_input, deadline)
+    if semantic_index is None:
+        return predicted_emotion, probabilities, get_quranic_verse(predicted_emotion, verse_index), None
+    verses, related = select_verses([user_input], [predicted_emotion])
+    return predicted_emotion, probabilities, verses[0], related[0]
+
+# Function to predict emotions and verses for many texts in one call (the batch already
+# left the queue, so `deadline` is not checked again)
+def predict_emotions_batch(user_inputs, deadline=None):
+    predicted_emotions, probabilities = classify_emotion_serving_batch(user_inputs)
+    verses, related = select_verses(user_inputs, predicted_emotions)
+    predictions = [
+        {
+            "predicted_emotion": predicted_emotion,
+            "probabilities": row,
+            "quranic_verse": verse,
+        }
+        for predicted_emotion, row, verse in zip(predicted_emotions, probabilities.tolist(), verses)
+    ]
+    if semantic_index is not None:
+        for prediction, matches in zip(predictions, related):
+            prediction["related_verses"] = matches
+    return predictions
+
+# Record the start time of every request for the latency metrics
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+# Count every finished request by endpoint and status
+@app.after_request
+def record_request(response):
+    if metrics is not None and request.endpoint != "metrics_endpoint":
+        metrics.observe_request(request.endpoint, response.status_code, time.perf_counter() - g.request_start)
+    return response
+
+# Reject prediction requests with 503 until the models are loaded and warmed up
+@app.before_request
+def require_ready():
+    if request.endpoint in ("predict", "predict_batch", "search", "verse") and not ready_event.is_set():
+        response = jsonify({"error": "Models are still loading"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+# Backpressure: the inference queue is full
+@app.errorhandler(QueueFull)
+def queue_full(exc):
+    response = jsonify({"error": "Server is busy, retry later"})
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response, 429
+
+# The request deadline passed before its inference finished
+@app.errorhandler(DeadlineExceeded)
+def deadline_exceeded(exc):
+    return jsonify({"error": "Request deadline exceeded"}), 504
+
+# Define liveness endpoint
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+# Define readiness endpoint
+@app.route("/ready", methods=["GET"])
+def ready():
+    response = {
+        "ready": ready_event.is_set(),
+        "error": startup_error,
+        "timings": load_timings,
+    }
+    return jsonify(response), 200 if ready_event.is_set() else 503
 
 # Define API endpoint
 @app.route("/predict", methods=["POST"])
@@ -87,12 +640,15 @@ def predict():
     if not user_input:
         return jsonify({"error": "Input text is required"}), 400
 
-    # Predict emotion and get Quranic verse
-    predicted_emotion, probabilities = classify_emotion_ensemble(user_input)
-    verse = get_quranic_verse(predicted_emotion, quran_df)
-    print(f"Predicted Emotion: {predicted_emotion}")
-    print(f"Probabilities: {probabilities}")
-    print(f"Quranic Verse: {verse}")
+    # Predict emotion and get Quranic verse (chosen per request, even on a cache hit)
+    predicted_emotion, probabilities, verse, related = run_inference(predict_one, user_input)
+    if metrics is not None:
+        metrics.observe_predictions([predicted_emotion])
+    request_logger.info("Prediction", extra={"fields": {
+        "predicted_emotion": predicted_emotion,
+        "probabilities": probabilities.tolist(),
+        "text_length": len(user_input),
+    }})
 
     # Return response
     response = {
@@ -100,8 +656,129 @@ def predict():
         "probabilities": probabilities.tolist(),
         "quranic_verse": verse,
     }
+    if related is not None:
+        response["related_verses"] = related
+    return jsonify(response)
+
+# Define batch API endpoint
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    data = request.json
+    user_inputs = data.get("texts", [])
+    if not isinstance(user_inputs, list) or not user_inputs:
+        return jsonify({"error": "A non-empty list of texts is required"}), 400
+    if len(user_inputs) > config.PREDICT_BATCH_MAX_TEXTS:
+        return jsonify({"error": f"At most {config.PREDICT_BATCH_MAX_TEXTS} texts are allowed per request"}), 400
+    if not all(isinstance(text, str) and text for text in user_inputs):
+        return jsonify({"error": "Every text must be a non-empty string"}), 400
+
+    predictions = run_inference(predict_emotions_batch, user_inputs)
+    if metrics is not None:
+        metrics.observe_predictions([prediction["predicted_emotion"] for prediction in predictions])
+    request_logger.info("Batch prediction", extra={"fields": {
+        "texts": len(user_inputs),
+        "predicted_emotions": [prediction["predicted_emotion"] for prediction in predictions],
+    }})
+
+    response = {"predictions": predictions}
+    return jsonify(response)
+
+# Define verse search endpoint: ranked, paginated full-text search over the English and
+# (diacritic-insensitive) Arabic text of every verse, optionally for one emotion
+@app.route("/search", methods=["GET"])
+def search():
+    if search_index is None:
+        return jsonify({"error": "Search is disabled"}), 404
+    query = request.args.get("q", "").strip()
+    emotion = request.args.get("emotion") or None
+    match = request.args.get("match", "all")
+    try:
+        page = int(request.args.get("page", 1))
+        page_size = int(request.args.get("page_size", config.SEARCH_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "page and page_size must be integers"}), 400
+    if not query:
+        return jsonify({"error": "A query (q) is required"}), 400
+    if match not in ("all", "any"):
+        return jsonify({"error": "match must be 'all' or 'any'"}), 400
+    if emotion is not None and emotion not in label_map:
+        return jsonify({"error": f"emotion must be one of {sorted(label_map)}"}), 400
+    if page < 1 or not 1 <= page_size <= config.SEARCH_MAX_PAGE_SIZE:
+        return jsonify({"error": f"page must be at least 1 and page_size between 1 and {config.SEARCH_MAX_PAGE_SIZE}"}), 400
+
+    with stage("search"):
+        rows, scores, total = search_index.search(query, label=emotion, match=match, page=page, page_size=page_size)
+    results = [
+        {
+            "surah_no": int(verse_corpus.at[row, "surah_no"]),
+            "ayah_no_surah": int(verse_corpus.at[row, "ayah_no_surah"]),
+            "emotions": list(verse_corpus.at[row, "labels"]),
+            "verse": corpus_verses[row],
+            "score": float(score),
+        }
+        for row, score in zip(rows.tolist(), scores.tolist())
+    ]
+    response = {
+        "query": query,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": results,
+    }
+    return jsonify(response)
+
+# Define verse lookup endpoint: one verse of the corpus by surah and verse number. The
+# body is serialized at startup; clients revalidate with If-None-Match and get a 304.
+@app.route("/verse/<int:surah_no>/<int:ayah_no>", methods=["GET"])
+def verse(surah_no, ayah_no):
+    if verse_lookup is None:
+        return jsonify({"error": "Verse lookup is disabled"}), 404
+    status, body, headers = verse_lookup.response(surah_no, ayah_no, request.headers.get("If-None-Match"))
+    if body is None:
+        return jsonify({"error": f"No verse {ayah_no} in surah {surah_no}"}), 404
+    return Response(body, status=status, headers=headers, content_type=VERSE_CONTENT_TYPE)
+
+# Function to snapshot the cascade counters
+def _cascade_stats():
+    with cascade_lock:
+        requests, escalations = cascade_stats["requests"], cascade_stats["escalations"]
+    return {
+        "requests": requests,
+        "escalations": escalations,
+        "escalation_rate": escalations / requests if requests else 0.0,
+        "threshold": config.CASCADE_THRESHOLD,
+        "criterion": config.CASCADE_CRITERION,
+    }
+
+# Define statistics endpoint
+@app.route("/stats", methods=["GET"])
+def stats():
+    response = {
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "cascade": _cascade_stats() if config.CASCADE else None,
+        "worker_pool": inference_pool.stats() if inference_pool is not None else None,
+    }
     return jsonify(response)
 
+# Define Prometheus metrics endpoint
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if metrics is None:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+# Load the models: in the background so the server binds immediately, or before serving
+if config.LAZY_LOADING:
+    threading.Thread(target=start, name="startup", daemon=True).start()
+else:
+    start()
+
 # Run the app
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=3000)
\ No newline at end of file
+    if config.ASYNC_SERVING:
+        # Threaded server without the debug reloader; the worker pool bounds the inference concurrency
+        app.run(host="0.0.0.0", port=3000, threaded=True)
+    else:
+        app.run(debug=True, host="0.0.0.0", port=3000)
\ No newline at end of file
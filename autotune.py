@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Autotune CPU inference of the BERT + RoBERTa ensemble on this host. The
+# ensemble is benchmarked over a grid of intra-op threads, inter-op threads,
+# batch size and padding strategy. The configuration that best meets the target
+# is written to the serving profile, which config.py loads at startup. Every
+# measurement is saved next to the profile.
+#
+#   python autotune.py --objective throughput --max-latency-ms 250
+#   python autotune.py --objective latency --min-throughput 20
+#
+# The thread pools are fixed once a process has run a model, so every
+# (threads, inter-op threads) pair is measured in its own process. Inside it, the
+# batch sizes and padding strategies are measured one after the other. Batches
+# are verses drawn from the verse dataset with the --distribution of lengths
+# (see benchmarks/bench_padding.py). The ensemble runs sequentially, so both
+# members use the same thread pools. A batch size above 1 is served through
+# micro-batching, where a request can also wait up to --max-wait-ms for its batch
+# to fill, so the latency the targets bound is the request latency: the p95
+# batch latency plus that wait for batch sizes above 1.
+
+PROFILE_PATH = "./cache/serving_profile.json"
+PROFILE_VERSION = 1
+# Latency compared against --max-latency-ms, as recorded in the profile
+LATENCY_BOUND = "p95 request latency: p95 batch latency plus MICRO_BATCH_MAX_WAIT_MS for batch sizes above 1"
+# Padding strategies: (PADDING_STRATEGY, LENGTH_BUCKETS)
+PADDINGS = {
+    "longest": ("longest", ""),
+    "max_length": ("max_length", ""),
+    "buckets": ("longest", "16,32,64,128"),
+}
+
+
+# Function to list the default intra-op thread counts: powers of two up to the core count, and the core count
+def default_thread_counts():
+    cpu_count = os.cpu_count() or 1
+    counts = {cpu_count}
+    count = 1
+    while count < cpu_count:
+        counts.add(count)
+        count *= 2
+    return ",".join(str(count) for count in sorted(counts))
+
+
+# Function to parse a comma-separated list of integers
+def int_list(value):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+# Measure every batch size and padding strategy with the thread pools set by the parent
+def run_worker(args):
+    import torch
+
+    import app
+    import config
+    from benchmarks.bench_padding import sample_texts
+    from benchmarks.common import summarize_latencies
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    for padding in args.paddings.split(","):
+        config.PADDING_STRATEGY, buckets = PADDINGS[padding]
+        config.LENGTH_BUCKETS = int_list(buckets)
+        for batch_size in int_list(args.batch_sizes):
+            batches = [sample_texts(args.distribution, batch_size, rng) for _ in range(args.warmup + args.repeats)]
+            for batch in batches[:args.warmup]:
+                app.classify_emotion_ensemble_batch(batch)
+            latencies = []
+            for batch in batches[args.warmup:]:
+                start = time.perf_counter()
+                app.classify_emotion_ensemble_batch(batch)
+                latencies.append(time.perf_counter() - start)
+            summary = summarize_latencies(latencies)
+            rows.append({
+                "num_threads": torch.get_num_threads(),
+                "interop_threads": torch.get_num_interop_threads(),
+                "batch_size": batch_size,
+                "padding": padding,
+                "p50_ms": summary["p50_ms"],
+                "p95_ms": summary["p95_ms"],
+                "p99_ms": summary["p99_ms"],
+                "mean_ms": summary["mean_ms"],
+                "throughput": batch_size * len(latencies) / sum(latencies),
+            })
+    print(json.dumps({"torch": torch.__version__, "rows": rows}))
+
+
+# Function to add the p95 request latency of every measurement: a batch size above 1
+# is served through micro-batching, so a request can wait max_wait_ms before its batch runs
+def add_request_latency(table, max_wait_ms):
+    table["request_p95_ms"] = table["p95_ms"] + np.where(table["batch_size"] > 1, max_wait_ms, 0.0)
+    return table
+
+
+# Function to pick the measurement that best meets the target; returns (row, target_met).
+# "throughput" maximizes texts/sec among rows whose p95 request latency is within
+# max_latency_ms; "latency" minimizes p95 request latency among rows reaching min_throughput.
+def choose(table, objective, max_latency_ms=None, min_throughput=None):
+    if objective == "throughput":
+        candidates = table if max_latency_ms is None else table[table["request_p95_ms"] <= max_latency_ms]
+        if candidates.empty:
+            return table.sort_values(["request_p95_ms", "throughput"], ascending=[True, False]).iloc[0], False
+        return candidates.sort_values(["throughput", "request_p95_ms"], ascending=[False, True]).iloc[0], True
+    if objective == "latency":
+        candidates = table if min_throughput is None else table[table["throughput"] >= min_throughput]
+        if candidates.empty:
+            return table.sort_values(["throughput", "request_p95_ms"], ascending=[False, True]).iloc[0], False
+        return candidates.sort_values(["request_p95_ms", "throughput"], ascending=[True, False]).iloc[0], True
+    raise ValueError(f"Unknown objective: {objective}")
+
+
+# Function to turn a measurement into the config settings it stands for, written the
+# way they would be set in the environment
+def profile_settings(row, max_wait_ms):
+    padding_strategy, buckets = PADDINGS[row["padding"]]
+    return {
+        "NUM_THREADS": str(int(row["num_threads"])),
+        "INTEROP_THREADS": str(int(row["interop_threads"])),
+        "ENSEMBLE_EXECUTION": "sequential",
+        "PADDING_STRATEGY": padding_strategy,
+        "LENGTH_BUCKETS": buckets,
+        "MICRO_BATCHING": "1" if row["batch_size"] > 1 else "0",
+        "MICRO_BATCH_MAX_SIZE": str(int(row["batch_size"])),
+        "MICRO_BATCH_MAX_WAIT_MS": str(max_wait_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autotune ensemble inference settings for this host")
+    parser.add_argument("--objective", choices=["throughput", "latency"], default="throughput")
+    parser.add_argument("--max-latency-ms", type=float,
+                        help="p95 request latency the throughput objective must stay within: the p95 batch latency, "
+                             "plus --max-wait-ms for batch sizes above 1")
+    parser.add_argument("--min-throughput", type=float, help="texts/sec the latency objective must reach")
+    parser.add_argument("--threads", default=default_thread_counts(), help="intra-op thread counts")
+    parser.add_argument("--interop-threads", default="1,2", help="inter-op thread counts")
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="micro-batching wait written to the profile and added to the latency of batch sizes above 1")
+    parser.add_argument("--paddings", default=",".join(PADDINGS), help=f"padding strategies: {', '.join(PADDINGS)}")
+    parser.add_argument("--distribution", default="mixed", help="input lengths: short, medium, long or mixed")
+    parser.add_argument("--repeats", type=int, default=20, help="timed batches per configuration")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=PROFILE_PATH, help="serving profile to write")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    unknown = set(args.paddings.split(",")) - set(PADDINGS)
+    if unknown:
+        raise SystemExit(f"Unknown padding strategies: {', '.join(sorted(unknown))}")
+
+    rows = []
+    torch_version = None
+    pairs = [(threads, interop) for threads in int_list(args.threads) for interop in int_list(args.interop_threads)]
+    for i, (threads, interop) in enumerate(pairs, 1):
+        print(f"[{i}/{len(pairs)}] {threads} threads, {interop} inter-op threads...")
+        env = dict(
+            os.environ,
+            QURANJAR_PROFILE="",
+            QURANJAR_NUM_THREADS=str(threads),
+            QURANJAR_INTEROP_THREADS=str(interop),
+            QURANJAR_ENSEMBLE_EXECUTION="sequential",
+            QURANJAR_LAZY_LOADING="0",
+            QURANJAR_CASCADE="0",
+            QURANJAR_STUDENT="0",
+            QURANJAR_VERSE_RETRIEVAL="random",
+            QURANJAR_SEARCH="0",
+            QURANJAR_VERSE_LOOKUP="0",
+        )
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--batch-sizes", args.batch_sizes, "--paddings", args.paddings,
+             "--distribution", args.distribution, "--repeats", str(args.repeats), "--warmup", str(args.warmup),
+             "--seed", str(args.seed)],
+            env=env, check=True, capture_output=True, text=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        torch_version = result["torch"]
+        rows.extend(result["rows"])
+
+    table = add_request_latency(pd.DataFrame(rows), args.max_wait_ms)
+    row, target_met = choose(table, args.objective, args.max_latency_ms, args.min_throughput)
+    table["chosen"] = table.index == row.name
+    sort_by = ["throughput", "request_p95_ms"] if args.objective == "throughput" else ["request_p95_ms", "throughput"]
+    table = table.sort_values(sort_by, ascending=[args.objective != "throughput", args.objective == "throughput"])
+    print()
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    measurements_path = f"{os.path.splitext(args.output)[0]}_measurements.csv"
+    table.to_csv(measurements_path, index=False)
+    profile = {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "hostname": platform.node(),
+            "cpu_count": os.cpu_count(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "torch": torch_version,
+        },
+        "target": {
+            "objective": args.objective,
+            "max_latency_ms": args.max_latency_ms,
+            "min_throughput": args.min_throughput,
+            "latency": LATENCY_BOUND,
+        },
+        "target_met": target_met,
+        "measurement": {key: value.item() if hasattr(value, "item") else value for key, value in row.items()},
+        "measurements": os.path.basename(measurements_path),
+        "settings": profile_settings(row, args.max_wait_ms),
+    }
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+
+    if not target_met:
+        print("\nNo configuration meets the target; the profile uses the closest one")
+    print(f"\nChosen: {row['num_threads']} threads, {row['interop_threads']} inter-op threads, batch size {row['batch_size']}, "
+          f"{row['padding']} padding: p95 request latency {row['request_p95_ms']:.1f} ms "
+          f"(batch {row['p95_ms']:.1f} ms), {row['throughput']:.1f} texts/sec")
+    print(f"Profile saved to '{args.output}', measurements to '{measurements_path}'")
+
+
+if __name__ == "__main__":
+    main()
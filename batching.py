@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+from worker_pool import DeadlineExceeded
+
+
+# Collects concurrent single-item requests into batches and runs them through
+# `batch_fn` on a background thread. A batch is flushed as soon as it holds
+# `max_batch_size` items or its oldest item has waited `max_wait_ms`.
+# `batch_fn` takes a list of items and returns one result per item, in order.
+# An item may carry a deadline (a time.monotonic() value); items whose deadline
+# has passed by the time their batch is flushed are failed with DeadlineExceeded
+# and never reach `batch_fn`.
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        # Statistics
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._expired = 0
+        self._max_queue_depth = 0
+        self._batch_sizes = Counter()
+
+    # Queue an item and return a Future that resolves to its result
+    def submit(self, item, deadline=None):
+        future = Future()
+        with self._cond:
+            self._ensure_started()
+            self._queue.append((item, future, time.monotonic(), deadline))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return future
+
+    # Queue an item and block until its result is ready
+    def __call__(self, item, timeout=None, deadline=None):
+        return self.submit(item, deadline).result(timeout)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            mean_batch_size = self._items / self._batches if self._batches else 0.0
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "expired": self._expired,
+                "mean_batch_size": mean_batch_size,
+                "max_batch_size_seen": max(self._batch_sizes, default=0),
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    # The worker thread is started lazily so that a process forked after the
+    # batcher was created gets its own worker on first use.
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Drop requests whose caller has already given up
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            # Fail requests whose deadline passed while they waited for the batch
+            now = time.monotonic()
+            expired = [entry for entry in batch if entry[3] is not None and now >= entry[3]]
+            for _, future, _, _ in expired:
+                future.set_exception(DeadlineExceeded("Request deadline expired waiting for a batch"))
+            if expired:
+                batch = [entry for entry in batch if entry[3] is None or now < entry[3]]
+                with self._cond:
+                    self._expired += len(expired)
+            if not batch:
+                continue
+            items = [item for item, _, _, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as exc:
+                for _, future, _, _ in batch:
+                    future.set_exception(exc)
+                failed = True
+            else:
+                for (_, future, _, _), result in zip(batch, results):
+                    future.set_result(result)
+                failed = False
+
+            with self._cond:
+                self._batches += 1
+                self._items += len(items)
+                self._errors += int(failed)
+                self._batch_sizes[len(items)] += 1
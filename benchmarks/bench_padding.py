@@ -0,0 +1,72 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import app
+import config
+from benchmarks.common import print_table, summarize_latencies, time_calls
+
+# Compare fixed max_length=128 padding with dynamic padding (optionally with
+# length buckets) across input-length distributions drawn from the verse
+# translations, and check that the probabilities match.
+#
+#   python -m benchmarks.bench_padding --batch-size 16 --buckets 16,32,64,128
+
+# Input-length distributions, by number of words
+DISTRIBUTIONS = {
+    "short": (1, 12),
+    "medium": (13, 40),
+    "long": (41, 10_000),
+    "mixed": (1, 10_000),
+}
+
+
+def sample_texts(distribution, batch_size, rng):
+    low, high = DISTRIBUTIONS[distribution]
+    texts = pd.Series(list(app.quran_df["ayah_en"])).dropna()
+    word_counts = texts.str.split().str.len()
+    candidates = texts[(word_counts >= low) & (word_counts <= high)].tolist()
+    return [candidates[i] for i in rng.integers(0, len(candidates), size=batch_size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark max_length vs dynamic padding")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--buckets", default="16,32,64,128")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    buckets = [int(bound) for bound in args.buckets.split(",") if bound.strip()]
+    modes = {
+        "max_length": ("max_length", []),
+        "longest": ("longest", []),
+        "longest+buckets": ("longest", buckets),
+    }
+
+    for distribution in DISTRIBUTIONS:
+        texts = sample_texts(distribution, args.batch_size, rng)
+        results = {}
+        reference = None
+        max_abs_diff = {}
+        for name, (strategy, length_buckets) in modes.items():
+            config.PADDING_STRATEGY = strategy
+            config.LENGTH_BUCKETS = length_buckets
+            _, probabilities = app.classify_emotion_ensemble_batch(texts)
+            if reference is None:
+                reference = probabilities
+            max_abs_diff[name] = float(np.abs(probabilities - reference).max())
+            latencies = time_calls(lambda: app.classify_emotion_ensemble_batch(texts), repeats=args.repeats, warmup=args.warmup)
+            results[name] = summarize_latencies(latencies)
+
+        print(f"\n{distribution} inputs, batch size {args.batch_size}")
+        print_table(results)
+        for name, diff in max_abs_diff.items():
+            print(f"  {name}: max |p - p_max_length| = {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+
+import app
+import config
+from benchmarks.common import SAMPLE_TEXTS, print_table, summarize_latencies, time_calls
+
+# Compare the sequential ensemble (BERT then RoBERTa) with the parallel mode
+# where both members run at the same time on their own executors.
+#
+#   QURANJAR_BERT_NUM_THREADS=8 QURANJAR_ROBERTA_NUM_THREADS=8 \
+#       python -m benchmarks.bench_parallel_ensemble --batch-size 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs parallel ensemble execution")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(args.batch_size)]
+    print(f"Thread split: BERT={config.BERT_NUM_THREADS}, RoBERTa={config.ROBERTA_NUM_THREADS}")
+
+    results = {}
+    for name, parallel in (("sequential", False), ("parallel", True)):
+        latencies = time_calls(
+            lambda: app.classify_emotion_ensemble_batch(texts, parallel=parallel),
+            repeats=args.repeats,
+            warmup=args.warmup,
+        )
+        results[name] = summarize_latencies(latencies)
+
+    print_table(results)
+    speedup = results["sequential"]["p50_ms"] / results["parallel"]["p50_ms"]
+    print(f"p50 speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import random
+import time
+import timeit
+
+from search_index import SearchIndex, normalize_arabic, tokenize
+from verse_corpus import load_verse_corpus
+
+# Per-query cost of verse search: a pandas `str.contains` scan over the English
+# and normalized Arabic text of every verse (what a client-side search does on
+# each keystroke) against the inverted index behind /search. Queries are one to
+# three words drawn from the verses themselves. The scan matches substrings and
+# the index whole words (the last one also as a prefix), so the result counts
+# differ slightly. Only needs the dataset.
+#
+#   python -m benchmarks.bench_search
+
+
+# Scan every verse for each query word, as SearchView does on the phone
+def pandas_search(corpus, normalized_arabic, query, label=None):
+    selected = None
+    for term in query.split():
+        arabic_term = normalize_arabic(term)
+        matches = corpus["ayah_en"].str.contains(term, case=False, regex=False) | normalized_arabic.str.contains(arabic_term, regex=False)
+        selected = matches if selected is None else selected & matches
+    if label is not None:
+        selected &= corpus["labels"].apply(lambda labels: label in labels)
+    return corpus[selected]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /search inverted index against a pandas scan")
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = load_verse_corpus()
+    start = time.perf_counter()
+    index = SearchIndex.from_corpus(corpus)
+    build_seconds = time.perf_counter() - start
+    normalized_arabic = corpus["ayah_ar"].map(normalize_arabic)
+    print(f"Index build: {build_seconds * 1000:.1f} ms for {len(index)} verses, {len(index.postings)} terms")
+
+    rng = random.Random(args.seed)
+    queries = []
+    for _ in range(args.number):
+        row = corpus.iloc[rng.randrange(len(corpus))]
+        words = tokenize(row["ayah_en"] if rng.random() < 0.7 else row["ayah_ar"])
+        if words:
+            start_word = rng.randrange(len(words))
+            queries.append(" ".join(words[start_word:start_word + rng.randint(1, 3)]))
+    terms = sum(len(query.split()) for query in queries)
+
+    for name, label in (("all verses", None), ("one emotion", "joy")):
+        pandas_seconds = timeit.timeit(lambda: [pandas_search(corpus, normalized_arabic, query, label) for query in queries], number=1)
+        index_seconds = timeit.timeit(lambda: [index.search(query, label=label) for query in queries], number=1)
+        print(f"\n{name}:")
+        print(f"  pandas str.contains: {pandas_seconds / len(queries) * 1e6:10.1f} us/query")
+        print(f"  inverted index:      {index_seconds / len(queries) * 1e6:10.1f} us/query, {index_seconds / terms * 1e6:.1f} us/term")
+        print(f"  speedup: {pandas_seconds / index_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
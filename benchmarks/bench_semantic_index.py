@@ -0,0 +1,54 @@
+import argparse
+import timeit
+
+import numpy as np
+
+from semantic_index import INDEX_DIR, QUERY_BUDGET_MS, SemanticIndex
+from verse_corpus import load_verse_corpus
+
+# Load time of the memory-mapped semantic index and per-query lookup latency,
+# with and without the emotion filter. Queries are verse embeddings with
+# noise added, so no embedding model is needed; build the index first with
+# `python semantic_index.py`. Exits with status 1 when a lookup is slower than
+# --budget-ms per query.
+#
+#   python -m benchmarks.bench_semantic_index --k 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the semantic verse index")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-ms", type=float, default=QUERY_BUDGET_MS, help="per-query latency budget")
+    args = parser.parse_args()
+
+    labels = load_verse_corpus()["labels"].tolist()
+    load_seconds = min(timeit.repeat(lambda: SemanticIndex.load(args.index_dir, labels=labels), number=1, repeat=5))
+    index = SemanticIndex.load(args.index_dir, labels=labels)
+    print(f"Index: {len(index)} verses x {index.meta['dim']} dimensions ({index.meta['model']})")
+    print(f"load (float32 conversion):  {load_seconds * 1000:8.2f} ms")
+
+    rng = np.random.default_rng(args.seed)
+    queries = np.asarray(index.embeddings[rng.integers(0, len(index), size=args.number)], dtype=np.float32)
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    emotions = sorted(index.rows_by_label)
+
+    unfiltered = timeit.timeit(lambda: [index.search(query, args.k) for query in queries], number=1)
+    filtered = timeit.timeit(
+        lambda: [index.search(query, args.k, label=emotions[i % len(emotions)]) for i, query in enumerate(queries)],
+        number=1,
+    )
+    print(f"top-{args.k} lookup:               {unfiltered / args.number * 1e6:8.2f} us/query")
+    print(f"top-{args.k} lookup, one emotion:  {filtered / args.number * 1e6:8.2f} us/query")
+
+    slowest_ms = max(unfiltered, filtered) / args.number * 1000
+    if slowest_ms > args.budget_ms:
+        raise SystemExit(f"Lookup takes {slowest_ms:.3f} ms per query, over the {args.budget_ms} ms budget")
+    print(f"Within the {args.budget_ms} ms per-query budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+import app
+import config
+import stage_timing
+from benchmarks.bench_padding import DISTRIBUTIONS, sample_texts
+from benchmarks.common import print_table, run_level, url_sender
+
+# End-to-end benchmark of the serving path. Requests are sent to app.py through
+# Flask's test client or a local HTTP server at each concurrency level, with
+# inputs drawn from an input-length distribution. Reports p50/p95/p99 latency,
+# requests/sec and the time spent per stage (tokenization, each model's forward
+# pass, ensembling, verse lookup), and saves everything as JSON so runs can be
+# compared across commits and serving modes (set through the QURANJAR_* variables).
+#
+#   python -m benchmarks.bench_serving --concurrency 1,4,16 --distribution mixed
+#   QURANJAR_MICRO_BATCHING=1 python -m benchmarks.bench_serving --transport http --label micro_batching
+
+
+# Function to send requests through Flask's test client; one client per thread
+def test_client_sender(endpoint):
+    local = threading.local()
+
+    def send(payload):
+        if not hasattr(local, "client"):
+            local.client = app.app.test_client()
+        response = local.client.post(endpoint, json=payload)
+        return response.status_code
+
+    return send
+
+
+# Function to start app.py on a local HTTP server and send requests to it over sockets
+def http_sender(endpoint, port):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return url_sender(f"http://127.0.0.1:{server.server_port}{endpoint}"), server
+
+
+# Function to get the current commit, if the benchmark runs in a git checkout
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency and throughput benchmark of the serving path")
+    parser.add_argument("--transport", choices=["test-client", "http"], default="test-client")
+    parser.add_argument("--port", type=int, default=0, help="port of the local HTTP server (0 picks a free one)")
+    parser.add_argument("--endpoint", choices=["predict", "predict_batch"], default="predict")
+    parser.add_argument("--batch-size", type=int, default=8, help="texts per /predict_batch request")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated numbers of concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests before each level")
+    parser.add_argument("--distribution", choices=sorted(DISTRIBUTIONS), default="mixed",
+                        help="input length distribution, in words of the verse translations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default=None, help="name of the run, used in the output file name")
+    parser.add_argument("--output-dir", default="./eval_metrics")
+    args = parser.parse_args()
+
+    app.ready_event.wait()
+    rng = np.random.default_rng(args.seed)
+    server = None
+    endpoint = f"/{args.endpoint}"
+    if args.transport == "http":
+        send, server = http_sender(endpoint, args.port)
+    else:
+        send = test_client_sender(endpoint)
+
+    # Function to draw the payloads of one level
+    def make_payloads(count):
+        if args.endpoint == "predict":
+            return [{"text": text} for text in sample_texts(args.distribution, count, rng)]
+        return [{"texts": sample_texts(args.distribution, args.batch_size, rng)} for _ in range(count)]
+
+    recorder = stage_timing.StageRecorder()
+    stage_timing.add_observer(recorder)
+    levels = {}
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(",") if level.strip()]:
+            run_level(send, make_payloads(args.warmup), concurrency)
+            recorder.reset()
+            summary = run_level(send, make_payloads(args.requests), concurrency)
+            summary["stages"] = recorder.summary()
+            levels[f"concurrency_{concurrency}"] = summary
+    finally:
+        stage_timing.remove_observer(recorder)
+        if server is not None:
+            server.shutdown()
+
+    print(f"\n{args.endpoint} over {args.transport}, {args.distribution} inputs")
+    print_table(levels, columns=("p50_ms", "p95_ms", "p99_ms", "requests_per_second"))
+    for level, summary in levels.items():
+        print(f"\n{level}: time per stage")
+        print_table(summary["stages"], columns=("count", "mean_ms", "p95_ms", "total_ms", "share"))
+
+    label = args.label or f"{args.endpoint}_{args.transport}_{args.distribution}"
+    result = {
+        "label": label,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "transport": args.transport,
+        "endpoint": args.endpoint,
+        "batch_size": args.batch_size if args.endpoint == "predict_batch" else 1,
+        "distribution": args.distribution,
+        "config": {name: getattr(config, name) for name in dir(config) if name.isupper()},
+        "cpu_count": os.cpu_count(),
+        "levels": levels,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"serving_benchmark_{label}.json")
+    with open(output_path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults saved to '{output_path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import random
+import timeit
+
+import pandas as pd
+
+from verse_index import VerseIndex
+
+# Per-request cost of picking a verse: the original pandas path (boolean mask,
+# filtered copy, sample, f-string) against the precomputed VerseIndex.
+# Only needs the dataset, not the models.
+#
+#   python -m benchmarks.bench_verse_index
+
+
+# The original get_quranic_verse from app.py
+def pandas_get_quranic_verse(predicted_emotion, df):
+    filtered_verses = df[df['label'] == predicted_emotion]
+    if filtered_verses.empty:
+        return "No verse found for the predicted emotion."
+    selected_row = filtered_verses.sample(n=1).iloc[0]
+    verse_with_details = f"{selected_row['ayah_ar']}\n{selected_row['ayah_en']} (Surah {selected_row['surah_name_roman']}: {selected_row['surah_name_en']}, Verse {selected_row['ayah_no_surah']})"
+    return verse_with_details
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark verse selection")
+    parser.add_argument("--dataset", default="./dataset/quran_emotions_cleaned_2.csv")
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.dataset)
+    build_seconds = min(timeit.repeat(lambda: VerseIndex.from_dataframe(df), number=1, repeat=5))
+    index = VerseIndex.from_dataframe(df)
+    labels = sorted(df["label"].unique())
+    print(f"Index build: {build_seconds * 1000:.2f} ms for {len(index)} verses")
+
+    emotions = [random.choice(labels) for _ in range(args.number)]
+    pandas_seconds = timeit.timeit(lambda: [pandas_get_quranic_verse(emotion, df) for emotion in emotions], number=1)
+    index_seconds = timeit.timeit(lambda: [index.sample(emotion) for emotion in emotions], number=1)
+
+    pandas_us = pandas_seconds / args.number * 1e6
+    index_us = index_seconds / args.number * 1e6
+    print(f"pandas filter + sample: {pandas_us:10.2f} us/request")
+    print(f"VerseIndex.sample:      {index_us:10.2f} us/request")
+    print(f"speedup: {pandas_us / index_us:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import http.client
+import threading
+import time
+import timeit
+import urllib.parse
+
+import numpy as np
+
+from benchmarks.common import print_table, run_level
+from verse_corpus import load_verse_corpus
+from verse_index import format_verse
+from verse_lookup import CONTENT_TYPE, VerseLookup
+
+# Load test of GET /verse/<surah>/<ayah>. Reports the startup cost of the
+# lookup table and the pre-serialized bodies, then lookups/sec on one core: the
+# lookup alone, and through a Flask app with the same view (Flask's test client,
+# no sockets), for full responses and for 304 revalidations. Only needs the
+# dataset. With --url the requests go over HTTP to a running server instead, at
+# each --concurrency level; run the server as `python serve_prefork.py
+# --workers 1 --threads-per-worker 1 --threaded` for a per-core figure.
+#
+#   python -m benchmarks.bench_verse_lookup --number 100000
+#   python -m benchmarks.bench_verse_lookup --url http://127.0.0.1:3000 --concurrency 1,8,32
+
+
+# Function to build a Flask app serving the lookup the way app.py does
+def lookup_app(lookup):
+    from flask import Flask, Response, jsonify, request
+
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/verse/<int:surah_no>/<int:ayah_no>", methods=["GET"])
+    def verse(surah_no, ayah_no):
+        status, body, headers = lookup.response(surah_no, ayah_no, request.headers.get("If-None-Match"))
+        if body is None:
+            return jsonify({"error": f"No verse {ayah_no} in surah {surah_no}"}), 404
+        return Response(body, status=status, headers=headers, content_type=CONTENT_TYPE)
+
+    return flask_app
+
+
+# Function to send lookups to a running server over keep-alive connections, one per
+# thread. A payload is (surah, verse, ETag or None); a 304 counts as success.
+def http_sender(url):
+    parsed = urllib.parse.urlsplit(url)
+    local = threading.local()
+
+    def send(payload):
+        surah_no, ayah_no, etag = payload
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+        headers = {"If-None-Match": etag} if etag else {}
+        local.connection.request("GET", f"{parsed.path.rstrip('/')}/verse/{surah_no}/{ayah_no}", headers=headers)
+        response = local.connection.getresponse()
+        response.read()
+        return 200 if response.status == 304 else response.status
+
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the /verse lookup endpoint")
+    parser.add_argument("--number", type=int, default=100_000, help="lookups per in-process measurement")
+    parser.add_argument("--url", help="base URL of a running server; measures over HTTP")
+    parser.add_argument("--requests", type=int, default=20_000, help="requests per concurrency level with --url")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--revalidate-share", type=float, default=0.5, help="share of requests sent with a matching If-None-Match")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = load_verse_corpus()
+    columns = ["ayah_ar", "ayah_en", "surah_name_roman", "surah_name_en", "ayah_no_surah"]
+    verses = tuple(format_verse(*details) for details in corpus[columns].itertuples(index=False, name=None))
+    start = time.perf_counter()
+    lookup = VerseLookup.from_corpus(corpus, verses, max_age=86400)
+    build_seconds = time.perf_counter() - start
+    body_bytes = sum(len(body) for body in lookup.bodies)
+    print(f"Lookup table and bodies: {build_seconds * 1000:.1f} ms for {len(lookup)} verses, "
+          f"{body_bytes / 1024:.0f} KB of bodies, {lookup.rows.nbytes / 1024:.0f} KB row array")
+
+    rng = np.random.default_rng(args.seed)
+    keys = corpus[["surah_no", "ayah_no_surah"]].to_numpy()
+    picks = rng.integers(0, len(keys), size=max(args.number, args.requests))
+    revalidate = rng.random(len(picks)) < args.revalidate_share
+    payloads = [
+        (int(keys[row][0]), int(keys[row][1]), lookup.etags[row] if matched else None)
+        for row, matched in zip(picks.tolist(), revalidate.tolist())
+    ]
+
+    if args.url:
+        results = {}
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            summary = run_level(http_sender(args.url), payloads[:args.requests], concurrency)
+            results[f"concurrency {concurrency}"] = summary
+            print(f"concurrency {concurrency}: {summary['requests_per_second']:.0f} requests/sec, {summary['errors']} errors")
+        print()
+        print_table(results)
+        return
+
+    full = [(surah_no, ayah_no, None) for surah_no, ayah_no, _ in payloads[:args.number]]
+    cached = [(surah_no, ayah_no, lookup.etags[lookup.row(surah_no, ayah_no)]) for surah_no, ayah_no, _ in full]
+    client = lookup_app(lookup).test_client()
+    flask_number = max(1, args.number // 10)
+    print(f"\n{'':<28}{'lookups/sec':>14}{'us/lookup':>12}")
+    for name, fn, calls in (
+        ("lookup, 200", lambda: [lookup.response(s, a) for s, a, _ in full], len(full)),
+        ("lookup, 304", lambda: [lookup.response(s, a, etag) for s, a, etag in cached], len(cached)),
+        ("Flask, 200", lambda: [client.get(f"/verse/{s}/{a}") for s, a, _ in full[:flask_number]], flask_number),
+        ("Flask, 304", lambda: [client.get(f"/verse/{s}/{a}", headers={"If-None-Match": etag}) for s, a, etag in cached[:flask_number]], flask_number),
+    ):
+        seconds = timeit.timeit(fn, number=1)
+        print(f"{name:<28}{calls / seconds:>14.0f}{seconds / calls * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
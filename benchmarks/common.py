@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Shared helpers for the benchmark scripts. Run them from the repository root
+# as modules, e.g. `python -m benchmarks.bench_parallel_ensemble`, so that the
+# relative model and dataset paths used by app.py resolve.
+
+# Sample user inputs of increasing length
+SAMPLE_TEXTS = [
+    "I feel down lately.",
+    "I am so angry at my brother for what he said to me yesterday.",
+    "I am scared about my exams next week and I cannot sleep at night because of it.",
+    "Today was a wonderful day, I spent the afternoon with my family and we laughed a lot, "
+    "I feel grateful for everything I have been given and I want to remember this moment.",
+]
+
+
+# Time `fn()` `repeats` times after `warmup` untimed calls, returning seconds per call
+def time_calls(fn, repeats=20, warmup=3):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# Summarize a list of latencies in seconds as milliseconds
+def summarize_latencies(latencies):
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "count": int(latencies_ms.size),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+    }
+
+
+# Print one summary row per named result
+def print_table(results, columns=("mean_ms", "p50_ms", "p95_ms", "p99_ms")):
+    name_width = max(len(name) for name in results)
+    print(f"{'':<{name_width}}  " + "  ".join(f"{column:>10}" for column in columns))
+    for name, summary in results.items():
+        print(f"{name:<{name_width}}  " + "  ".join(f"{summary[column]:>10.2f}" for column in columns))
+
+
+# Function to send JSON requests to a running server over HTTP, returning the status code
+def url_sender(url):
+    def send(payload):
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    return send
+
+
+# Send every payload with `send` from `concurrency` closed-loop clients, returning
+# the latency summary, error count and requests/sec
+def run_level(send, payloads, concurrency):
+    latencies = [None] * len(payloads)
+    statuses = [None] * len(payloads)
+    next_index = iter(range(len(payloads)))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                statuses[i] = send(payloads[i])
+            except Exception:
+                statuses[i] = None  # counted as an error, e.g. a refused connection
+            latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    wall_time = time.perf_counter() - start
+
+    errors = sum(1 for status in statuses if status != 200)
+    summary = summarize_latencies(latencies)
+    summary.update({
+        "requests": len(payloads),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "requests_per_second": len(payloads) / wall_time,
+    })
+    return summary
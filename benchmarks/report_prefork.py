@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import print_table, run_level, url_sender
+
+# Report memory and throughput of pre-fork serving (serve_prefork.py) as the
+# worker count grows. For each worker count the server is started as a
+# subprocess, and RSS and PSS of the master and every worker are read from
+# /proc before and after a load test. PSS splits shared pages between the
+# processes that map them, so the total PSS is the real footprint. The total RSS
+# is roughly what the same number of independent app.py copies would use.
+# Linux only.
+#
+#   python -m benchmarks.report_prefork --workers 1,2,4 --requests 400
+
+
+# Function to read the RSS and PSS of a process in MB
+def memory_mb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                values[name.lower()] = int(rest.split()[0]) / 1024.0
+    return values
+
+
+# Function to list the pids of the workers forked by the master
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+# Function to wait until every worker is up and answering /ready
+def wait_until_ready(process, url, workers, timeout):
+    deadline = time.monotonic() + timeout
+    successes = 0
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve_prefork.py exited with status {process.returncode}")
+        if len(worker_pids(process.pid)) >= workers:
+            try:
+                with urllib.request.urlopen(f"{url}/ready", timeout=5) as response:
+                    successes += int(response.status == 200)
+            except OSError:
+                successes = 0
+            if successes >= 2 * workers:
+                return
+        time.sleep(0.5)
+    raise TimeoutError(f"{workers} workers were not ready after {timeout}s")
+
+
+# Function to snapshot the memory of the master and every worker
+def memory_snapshot(master_pid):
+    return {
+        "master": memory_mb(master_pid),
+        "workers": {str(pid): memory_mb(pid) for pid in worker_pids(master_pid)},
+    }
+
+
+# Function to sum RSS and PSS over the master and its workers
+def memory_totals(snapshot):
+    processes = [snapshot["master"]] + list(snapshot["workers"].values())
+    return {
+        "total_rss_mb": sum(process["rss"] for process in processes),
+        "total_pss_mb": sum(process["pss"] for process in processes),
+        "mean_worker_pss_mb": float(np.mean([process["pss"] for process in snapshot["workers"].values()])),
+    }
+
+
+# Measure one worker count
+def measure(args, workers, texts, rng):
+    port = args.port
+    url = f"http://127.0.0.1:{port}"
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    command = [sys.executable, "serve_prefork.py", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--threads-per-worker", str(threads)]
+    if args.pin_cores:
+        command.append("--pin-cores")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        start = time.perf_counter()
+        wait_until_ready(process, url, workers, args.startup_timeout)
+        ready_seconds = time.perf_counter() - start
+        before = memory_snapshot(process.pid)
+
+        send = url_sender(f"{url}/predict")
+        concurrency = args.clients_per_worker * workers
+        run_level(send, [{"text": texts[i]} for i in rng.integers(0, len(texts), size=args.warmup)], concurrency)
+        summary = run_level(send, [{"text": texts[i]} for i in rng.integers(0, len(texts), size=args.requests)], concurrency)
+        after = memory_snapshot(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "threads_per_worker": threads,
+        "clients": concurrency,
+        "ready_seconds": ready_seconds,
+        "load": summary,
+        "memory_before": before,
+        "memory_after": after,
+        "totals_before": memory_totals(before),
+        "totals_after": memory_totals(after),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory and throughput of pre-fork serving by worker count")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--clients-per-worker", type=int, default=2)
+    parser.add_argument("--pin-cores", action="store_true")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="./eval_metrics/prefork_report.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    texts = pd.read_csv("./dataset/quran_emotions.csv")["ayah_en"].dropna().tolist()
+    reports = {}
+    for workers in [int(count) for count in args.workers.split(",") if count.strip()]:
+        print(f"Measuring {workers} worker(s)...")
+        reports[f"{workers}_workers"] = measure(args, workers, texts, rng)
+
+    rows = {
+        name: {
+            "requests_per_second": report["load"]["requests_per_second"],
+            "p50_ms": report["load"]["p50_ms"],
+            "p95_ms": report["load"]["p95_ms"],
+            "rss_before": report["totals_before"]["total_rss_mb"],
+            "pss_before": report["totals_before"]["total_pss_mb"],
+            "rss_after": report["totals_after"]["total_rss_mb"],
+            "pss_after": report["totals_after"]["total_pss_mb"],
+            "worker_pss": report["totals_after"]["mean_worker_pss_mb"],
+        }
+        for name, report in reports.items()
+    }
+    print()
+    print_table(rows, columns=tuple(next(iter(rows.values()))))
+    print("\nMemory in MB. The total RSS counts shared pages once per process, roughly the")
+    print("footprint of independent app.py copies; the total PSS is the real footprint.")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(reports, f, indent=2)
+    print(f"\nReport saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Compare the fp32 ensemble with the INT8 dynamic-quantized ensemble: latency,
+# throughput, resident memory and validation accuracy/F1 on the training split.
+# Each mode runs in its own process so the memory numbers are not mixed.
+#
+#   python -m benchmarks.report_quantization --output ./eval_metrics/quantization_report.json
+
+MODES = {"fp32": "0", "int8": "1"}
+
+
+# Function to read the peak resident set size of this process in MB
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024.0 if sys.platform != "darwin" else usage / (1024.0 * 1024.0)
+
+
+# Measure one serving mode inside the current process
+def run_worker(args):
+    start = time.perf_counter()
+    import app
+    from benchmarks.common import SAMPLE_TEXTS, summarize_latencies, time_calls
+    from evaluate import classification_metrics, load_validation_split
+    load_seconds = time.perf_counter() - start
+    rss_after_load = peak_rss_mb()
+
+    val_texts, val_labels = load_validation_split()
+    preds = []
+    for i in range(0, len(val_texts), args.batch_size):
+        predicted_labels, _ = app.classify_emotion_ensemble_batch(val_texts[i:i + args.batch_size])
+        preds.extend(predicted_labels)
+    metrics = classification_metrics(list(val_labels), preds)
+
+    latencies = time_calls(lambda: app.classify_emotion_ensemble(SAMPLE_TEXTS[0]), repeats=args.repeats)
+    throughput_texts = [val_texts[i % len(val_texts)] for i in range(args.batch_size)]
+    batch_latencies = time_calls(lambda: app.classify_emotion_ensemble_batch(throughput_texts), repeats=max(3, args.repeats // 5))
+
+    report = {
+        "load_seconds": load_seconds,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "latency_batch_1": summarize_latencies(latencies),
+        "throughput_texts_per_second": args.batch_size / float(np.median(batch_latencies)),
+        "validation": metrics,
+        "validation_size": len(val_texts),
+    }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report fp32 vs INT8 dynamic-quantized ensemble")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--output", default="./eval_metrics/quantization_report.json")
+    parser.add_argument("--worker", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    reports = {}
+    for mode, quantize in MODES.items():
+        print(f"Measuring {mode} ensemble...")
+        env = dict(os.environ, QURANJAR_QUANTIZE=quantize)
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.report_quantization", "--worker", mode,
+             "--batch-size", str(args.batch_size), "--repeats", str(args.repeats)],
+            env=env, check=True, capture_output=True, text=True,
+        )
+        reports[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    print(f"\n{'':<28}{'fp32':>12}{'int8':>12}")
+    rows = [
+        ("p50 latency, batch 1 (ms)", lambda r: r["latency_batch_1"]["p50_ms"]),
+        ("p95 latency, batch 1 (ms)", lambda r: r["latency_batch_1"]["p95_ms"]),
+        ("throughput (texts/s)", lambda r: r["throughput_texts_per_second"]),
+        ("RSS after load (MB)", lambda r: r["rss_after_load_mb"]),
+        ("peak RSS (MB)", lambda r: r["peak_rss_mb"]),
+        ("validation accuracy", lambda r: r["validation"]["accuracy"]),
+        ("validation F1", lambda r: r["validation"]["f1"]),
+    ]
+    for name, value in rows:
+        print(f"{name:<28}{value(reports['fp32']):>12.4f}{value(reports['int8']):>12.4f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(reports, f, indent=2)
+    print(f"\nReport saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Startup time and memory of loading the verse datasets from CSV against the
+# columnar verse store (verse_store.py). Each run is a fresh subprocess that
+# loads what the service loads at startup: the labeled verses behind /predict
+# (and their per-emotion index) and the full corpus behind /search and semantic
+# retrieval. RSS and private dirty memory (the part no other process can share)
+# are read from /proc before and after each step. Build the store first with
+# `python verse_store.py`. Linux only.
+#
+#   python -m benchmarks.report_verse_store --runs 5
+
+MODES = ["csv", "store"]
+
+
+# Function to read the RSS and private dirty memory of this process in MB
+def memory_mb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Private_Dirty"):
+                values[name.lower()] = int(rest.split()[0]) / 1024.0
+    return values
+
+
+# Function to time a step and the memory it adds
+def measure(fn):
+    before = memory_mb()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    after = memory_mb()
+    return result, {
+        "ms": seconds * 1000,
+        "rss_mb": after["rss"] - before["rss"],
+        "private_dirty_mb": after["private_dirty"] - before["private_dirty"],
+    }
+
+
+# Load the datasets one way inside the current process
+def run_worker(mode):
+    import pandas as pd
+
+    import verse_index
+    from verse_corpus import LABELED_PATH, load_verse_corpus
+    from verse_store import STORE_DIR, open_store
+
+    if mode == "store" and open_store(LABELED_PATH) is None:
+        raise SystemExit("The verse store is not built or is out of date; run `python verse_store.py`")
+
+    def load_verses():
+        if mode == "store":
+            store = open_store(LABELED_PATH, verse_index.COLUMNS)
+            return store, verse_index.VerseIndex.from_store(store)
+        df = pd.read_csv(LABELED_PATH)
+        return df, verse_index.VerseIndex.from_dataframe(df)
+
+    (verses, _), verses_report = measure(load_verses)
+    corpus, corpus_report = measure(lambda: load_verse_corpus(store_dir=STORE_DIR if mode == "store" else None))
+    if mode == "store":
+        retained = sum(array.nbytes for array in verses.arrays.values())
+    else:
+        retained = int(verses.memory_usage(deep=True).sum())
+    report = {
+        "verses": verses_report,
+        "corpus": corpus_report,
+        "verses_retained_mb": retained / (1024.0 * 1024.0),
+        "corpus_mb": int(corpus.memory_usage(deep=True).sum()) / (1024.0 * 1024.0),
+    }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report CSV vs columnar verse store startup time and memory")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--output", default="./eval_metrics/verse_store_report.json")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    runs = {}
+    for mode in MODES:
+        print(f"Loading from {mode} ({args.runs} runs)...")
+        runs[mode] = []
+        for _ in range(args.runs):
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.report_verse_store", "--worker", mode],
+                check=True, capture_output=True, text=True,
+            )
+            runs[mode].append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    # Median over the runs of every number
+    def median(mode, step, key=None):
+        return float(np.median([run[step][key] if key else run[step] for run in runs[mode]]))
+
+    rows = [
+        ("verses load (ms)", "verses", "ms"),
+        ("verses RSS added (MB)", "verses", "rss_mb"),
+        ("verses private dirty (MB)", "verses", "private_dirty_mb"),
+        ("verses retained (MB)", "verses_retained_mb", None),
+        ("corpus load (ms)", "corpus", "ms"),
+        ("corpus RSS added (MB)", "corpus", "rss_mb"),
+        ("corpus private dirty (MB)", "corpus", "private_dirty_mb"),
+    ]
+    print(f"\n{'':<28}{'csv':>12}{'store':>12}")
+    summary = {mode: {} for mode in MODES}
+    for name, step, key in rows:
+        values = [median(mode, step, key) for mode in MODES]
+        for mode, value in zip(MODES, values):
+            summary[mode][name] = value
+        print(f"{name:<28}{values[0]:>12.2f}{values[1]:>12.2f}")
+    print("\nThe store's retained verses are file pages shared by every process that maps them.")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"median": summary, "runs": runs}, f, indent=2)
+    print(f"Report saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
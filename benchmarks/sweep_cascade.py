@@ -0,0 +1,82 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+import app
+from benchmarks.common import SAMPLE_TEXTS, time_calls
+from evaluate import classification_metrics, load_validation_split
+
+# Sweep cascade thresholds on the validation split. DistilBERT and the ensemble
+# each run once over the split; every threshold is then scored from those
+# probabilities, reporting accuracy/F1 against the escalation rate and the
+# mean compute per request (measured batch-1 latency of each stage).
+#
+#   python -m benchmarks.sweep_cascade --criterion margin
+
+
+# Function to predict the validation split in batches with a batch classifier
+def predict_probabilities(classify_batch, texts, batch_size):
+    return np.concatenate([classify_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep cascade thresholds on the validation split")
+    parser.add_argument("--criterion", choices=["probability", "margin"], default="probability")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.85,0.9,0.95,0.97,0.99")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default="./eval_metrics/cascade_sweep.csv")
+    args = parser.parse_args()
+
+    if app.distilbert_model is None:
+        app.distilbert_model, app.distilbert_tokenizer = app._load_distilbert()
+
+    val_texts, val_labels = load_validation_split()
+    val_texts = list(val_texts)
+    distilbert_probabilities = predict_probabilities(app.classify_emotion_distilbert_batch, val_texts, args.batch_size)
+    ensemble_probabilities = predict_probabilities(
+        lambda texts: app.classify_emotion_ensemble_batch(texts)[1], val_texts, args.batch_size
+    )
+
+    # Per-request cost of each stage at batch size 1
+    distilbert_ms = np.median(time_calls(lambda: app.classify_emotion_distilbert_batch(SAMPLE_TEXTS[:1]))) * 1000.0
+    ensemble_ms = np.median(time_calls(lambda: app.classify_emotion_ensemble_batch(SAMPLE_TEXTS[:1]))) * 1000.0
+    print(f"Batch-1 latency: DistilBERT {distilbert_ms:.2f} ms, ensemble {ensemble_ms:.2f} ms")
+
+    rows = []
+    for name, probabilities, escalation_rate, mean_ms in (
+        ("distilbert", distilbert_probabilities, 0.0, distilbert_ms),
+        ("ensemble", ensemble_probabilities, 1.0, ensemble_ms),
+    ):
+        preds = app.label_names[probabilities.argmax(axis=1)]
+        rows.append({"threshold": name, "escalation_rate": escalation_rate, "mean_ms": mean_ms,
+                     **classification_metrics(list(val_labels), list(preds))})
+
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        confident = app.cascade_confident(distilbert_probabilities, threshold, args.criterion)
+        probabilities = np.where(confident[:, None], distilbert_probabilities, ensemble_probabilities)
+        preds = app.label_names[probabilities.argmax(axis=1)]
+        escalation_rate = 1.0 - confident.mean()
+        rows.append({
+            "threshold": threshold,
+            "escalation_rate": escalation_rate,
+            "mean_ms": distilbert_ms + escalation_rate * ensemble_ms,
+            **classification_metrics(list(val_labels), list(preds)),
+        })
+
+    print(f"\n{'threshold':>10}{'escalated':>11}{'mean ms':>10}{'accuracy':>10}{'f1':>8}")
+    for row in rows:
+        threshold = row["threshold"] if isinstance(row["threshold"], str) else f"{row['threshold']:.2f}"
+        print(f"{threshold:>10}{row['escalation_rate']:>11.1%}{row['mean_ms']:>10.2f}{row['accuracy']:>10.4f}{row['f1']:>8.4f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nSweep saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import json
+import os
+
+# Serving configuration. Every setting can be overridden with an environment
+# variable of the same name prefixed with QURANJAR_, e.g.
+# QURANJAR_MICRO_BATCHING=1 python app.py
+#
+# The serving profile written by `python autotune.py` holds the settings tuned
+# for this host. Its values replace the defaults below; environment variables
+# still take precedence. QURANJAR_PROFILE="" ignores the profile.
+PROFILE_PATH = os.environ.get("QURANJAR_PROFILE", "./cache/serving_profile.json")
+
+
+def _load_profile(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+PROFILE = _load_profile(PROFILE_PATH)
+
+
+def _env(name, default):
+    if PROFILE is not None:
+        default = PROFILE["settings"].get(name, default)
+    return os.environ.get(f"QURANJAR_{name}", default)
+
+
+def _env_bool(name, default):
+    value = _env(name, None)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    return int(_env(name, default))
+
+
+def _env_float(name, default):
+    return float(_env(name, default))
+
+
+def _env_int_list(name, default):
+    value = _env(name, default)
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+# Micro-batching scheduler in front of the /predict endpoint
+MICRO_BATCHING = _env_bool("MICRO_BATCHING", False)
+MICRO_BATCH_MAX_WAIT_MS = _env_float("MICRO_BATCH_MAX_WAIT_MS", 5.0)
+MICRO_BATCH_MAX_SIZE = _env_int("MICRO_BATCH_MAX_SIZE", 16)
+
+# Batch prediction endpoint (/predict_batch)
+PREDICT_BATCH_MAX_TEXTS = _env_int("PREDICT_BATCH_MAX_TEXTS", 256)
+
+# Ensemble execution: "sequential" runs BERT then RoBERTa, "parallel" runs both
+# members at the same time, each on its own executor with a share of the
+# intra-op threads. torch.set_num_threads is process-wide, so each executor sets
+# its count right before its forward call and restores NUM_THREADS afterwards.
+# With the OpenMP backend the count a parallel region uses is taken from the
+# calling thread, so the split holds; with another backend (or MKL) the two
+# members can see each other's count while they overlap. Each executor logs
+# the count it runs with on its first call.
+ENSEMBLE_EXECUTION = _env("ENSEMBLE_EXECUTION", "sequential")
+BERT_NUM_THREADS = _env_int("BERT_NUM_THREADS", max(1, (os.cpu_count() or 1) // 2))
+ROBERTA_NUM_THREADS = _env_int("ROBERTA_NUM_THREADS", max(1, (os.cpu_count() or 1) // 2))
+
+# Torch thread pools: NUM_THREADS intra-op threads (torch.set_num_threads) and
+# INTEROP_THREADS inter-op threads. 0 keeps the torch default.
+NUM_THREADS = _env_int("NUM_THREADS", 0)
+INTEROP_THREADS = _env_int("INTEROP_THREADS", 0)
+
+# Tokenizer padding for inference: "longest" pads each batch only to its
+# longest sequence, "max_length" pads every input to 128 tokens. Optional
+# LENGTH_BUCKETS (e.g. "16,32,64,128") split a batch into groups of similar
+# token length that are padded and run separately.
+PADDING_STRATEGY = _env("PADDING_STRATEGY", "longest")
+LENGTH_BUCKETS = _env_int_list("LENGTH_BUCKETS", "")
+
+# Prediction cache for /predict, keyed by normalized input text (NFKC, collapsed
+# whitespace and, with PREDICTION_CACHE_CASE_INSENSITIVE, case folding). The
+# models classify the normalized text rather than the raw input, so every
+# input sharing a key gets the prediction that key stands for. A limit of 0
+# disables that bound.
+PREDICTION_CACHE = _env_bool("PREDICTION_CACHE", False)
+PREDICTION_CACHE_MAX_ENTRIES = _env_int("PREDICTION_CACHE_MAX_ENTRIES", 10000)
+PREDICTION_CACHE_MAX_BYTES = _env_int("PREDICTION_CACHE_MAX_BYTES", 0)
+PREDICTION_CACHE_TTL_SECONDS = _env_float("PREDICTION_CACHE_TTL_SECONDS", 0.0)
+PREDICTION_CACHE_CASE_INSENSITIVE = _env_bool("PREDICTION_CACHE_CASE_INSENSITIVE", False)
+
+# Serve INT8 dynamic-quantized models. The quantized artifacts are cached next
+# to the model directories (e.g. ./model/emotion_bert_model_1_int8.pt).
+QUANTIZE = _env_bool("QUANTIZE", False)
+
+# Inference backend: "torch" runs the eager PyTorch models, "onnx" runs the
+# models exported by export_onnx.py through ONNX Runtime on CPU. QUANTIZE only
+# applies to the torch backend. Thread counts of 0 keep the runtime default.
+BACKEND = _env("BACKEND", "torch")
+ONNX_INTRA_OP_THREADS = _env_int("ONNX_INTRA_OP_THREADS", 0)
+ONNX_INTER_OP_THREADS = _env_int("ONNX_INTER_OP_THREADS", 0)
+ONNX_EXECUTION_MODE = _env("ONNX_EXECUTION_MODE", "sequential")
+ONNX_GRAPH_OPTIMIZATION = _env("ONNX_GRAPH_OPTIMIZATION", "all")
+
+# Startup: with LAZY_LOADING the server binds immediately and the models load in
+# a background thread; /ready reports 503 until loading and warmup finish.
+# WARMUP_LENGTHS are the token lengths run once before reporting ready.
+LAZY_LOADING = _env_bool("LAZY_LOADING", False)
+WARMUP_LENGTHS = _env_int_list("WARMUP_LENGTHS", "8,32,128")
+
+# Confidence-gated cascade: DistilBERT answers alone when its top probability
+# (CASCADE_CRITERION="probability") or the gap between its two most likely
+# emotions ("margin") reaches CASCADE_THRESHOLD; otherwise the input is
+# escalated to the BERT + RoBERTa ensemble. The escalation rate is logged every
+# CASCADE_LOG_INTERVAL requests.
+CASCADE = _env_bool("CASCADE", False)
+CASCADE_THRESHOLD = _env_float("CASCADE_THRESHOLD", 0.9)
+CASCADE_CRITERION = _env("CASCADE_CRITERION", "probability")
+CASCADE_LOG_INTERVAL = _env_int("CASCADE_LOG_INTERVAL", 100)
+
+# Serve the single student distilled from the ensemble by train_distill.py
+# instead of BERT + RoBERTa
+STUDENT = _env_bool("STUDENT", False)
+STUDENT_MODEL_DIR = _env("STUDENT_MODEL_DIR", "./model/emotion_student_model_1")
+STUDENT_TOKENIZER_DIR = _env("STUDENT_TOKENIZER_DIR", "./model/emotion_student_tokenizer_1")
+
+# Verse selection: "random" picks a random verse of the predicted emotion;
+# "semantic" returns the SEMANTIC_TOP_K verses of the full corpus closest in
+# meaning to the user's text, from the embedding index built by
+# `python semantic_index.py`, restricted to the predicted emotion when
+# SEMANTIC_FILTER_BY_EMOTION is set. The filter is off by default: only the
+# labeled verses carry an emotion, so it excludes the rest of the corpus.
+VERSE_RETRIEVAL = _env("VERSE_RETRIEVAL", "random")
+SEMANTIC_INDEX_DIR = _env("SEMANTIC_INDEX_DIR", "./cache/verse_embeddings")
+SEMANTIC_MODEL = _env("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_TOP_K = _env_int("SEMANTIC_TOP_K", 3)
+SEMANTIC_FILTER_BY_EMOTION = _env_bool("SEMANTIC_FILTER_BY_EMOTION", False)
+
+# Columnar verse store built by `python verse_store.py`. When it is built and
+# up to date, the verse datasets are memory-mapped from VERSE_STORE_DIR instead
+# of parsed from CSV, and only the columns the service uses are loaded.
+VERSE_STORE = _env_bool("VERSE_STORE", True)
+VERSE_STORE_DIR = _env("VERSE_STORE_DIR", "./cache/verse_store")
+
+# Verse search (/search) over the full verse corpus, with an inverted index
+# built at startup
+SEARCH = _env_bool("SEARCH", True)
+SEARCH_PAGE_SIZE = _env_int("SEARCH_PAGE_SIZE", 10)
+SEARCH_MAX_PAGE_SIZE = _env_int("SEARCH_MAX_PAGE_SIZE", 100)
+
+# Verse lookup (/verse/<surah>/<ayah>) over the full verse corpus, with every
+# response body serialized at startup. VERSE_MAX_AGE_SECONDS is the
+# Cache-Control max-age of a verse (0 makes clients revalidate every time).
+VERSE_LOOKUP = _env_bool("VERSE_LOOKUP", True)
+VERSE_MAX_AGE_SECONDS = _env_int("VERSE_MAX_AGE_SECONDS", 86400)
+
+# Async serving: /predict and /predict_batch hand their inference to a pool of
+# ASYNC_WORKERS threads behind a queue of at most ASYNC_QUEUE_SIZE requests.
+# When the queue is full the server answers 429 with Retry-After. Every request
+# gets a deadline of REQUEST_TIMEOUT_MS (clients may shorten it with an
+# X-Request-Timeout-Ms header, 0 disables it); requests still queued at their
+# deadline are dropped before they reach the models and answered with 504.
+# With MICRO_BATCHING as well, a pool thread only waits on the micro-batcher, so
+# the pool gets at least MICRO_BATCH_MAX_SIZE threads; otherwise a batch could
+# never hold more requests than there are pool threads.
+ASYNC_SERVING = _env_bool("ASYNC_SERVING", False)
+ASYNC_WORKERS = _env_int("ASYNC_WORKERS", 2)
+ASYNC_QUEUE_SIZE = _env_int("ASYNC_QUEUE_SIZE", 64)
+REQUEST_TIMEOUT_MS = _env_float("REQUEST_TIMEOUT_MS", 2000.0)
+
+# Observability: Prometheus metrics on /metrics, and JSON logs written by a
+# background thread. LOG_SAMPLE_RATE is the share of per-request log records
+# that are kept (warnings and errors are always kept).
+METRICS = _env_bool("METRICS", True)
+LOG_LEVEL = _env("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATE = _env_float("LOG_SAMPLE_RATE", 0.01)
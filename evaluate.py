@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+
+import matplotlib
+matplotlib.use("Agg")  # Plots are written to files, so no display is needed
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
+
+# Dataset and split used by the train_*.py scripts
+TRAINING_DATASET = "./dataset/quran_emotions.csv"
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+OUTPUT_DIR = "./eval_metrics"
+
+# Function to load the train/validation split used by the training scripts
+def load_split(file_path=TRAINING_DATASET):
+    df = pd.read_csv(file_path)
+    df = df.dropna().reset_index(drop=True)
+    df['label'] = df['label'].astype(str)
+    train_texts, val_texts, train_labels, val_labels = train_test_split(
+        df["ayah_en"].values, df["label"].values, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+    return train_texts, val_texts, train_labels, val_labels
+
+# Function to load the validation split the models were evaluated on during training
+def load_validation_split(file_path=TRAINING_DATASET):
+    _, val_texts, _, val_labels = load_split(file_path)
+    return val_texts, val_labels
+
+# Function to compute the same metrics as the training scripts' compute_metrics
+def classification_metrics(labels, preds):
+    accuracy = accuracy_score(labels, preds)
+    precision, recall, f1, _ = precision_recall_fscore_support(labels, preds, average='weighted', zero_division=0)
+    return {
+        "accuracy": accuracy,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+    }
+
+# Function to compute every evaluation result from one set of validation logits
+def evaluate_logits(logits, label_ids, label_names):
+    preds = logits.argmax(-1)
+    label_indices = list(range(len(label_names)))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        label_ids, preds, labels=label_indices, average=None, zero_division=0
+    )
+    results = classification_metrics(label_ids, preds)
+    results["confusion_matrix"] = confusion_matrix(label_ids, preds, labels=label_indices).tolist()
+    results["per_class"] = {
+        label: {
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1": float(f1[i]),
+            "support": int(support[i]),
+        }
+        for i, label in enumerate(label_names)
+    }
+    results["label_names"] = list(label_names)
+    return results
+
+# Function to save the metrics bar plot and confusion matrix heatmap as image files
+def save_plots(results, name, output_dir=OUTPUT_DIR):
+    metrics = {
+        "Accuracy": results["accuracy"],
+        "Precision": results["precision"],
+        "Recall": results["recall"],
+        "F1-Score": results["f1"],
+    }
+    plt.figure(figsize=(8, 6))
+    sns.barplot(x=list(metrics.keys()), y=list(metrics.values()), palette="viridis")
+    plt.title("Model Evaluation Metrics", fontsize=16)
+    plt.ylabel("Score", fontsize=14)
+    plt.xlabel("Metric", fontsize=14)
+    plt.ylim(0, 1)  # Scores range from 0 to 1
+    metrics_plot_path = os.path.join(output_dir, f"evaluation_metrics_{name}.png")
+    plt.savefig(metrics_plot_path, bbox_inches="tight")
+    plt.close()
+
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(
+        np.array(results["confusion_matrix"]), annot=True, fmt="d", cmap="Blues",
+        xticklabels=results["label_names"], yticklabels=results["label_names"],
+    )
+    plt.xlabel("Predicted")
+    plt.ylabel("True")
+    confusion_plot_path = os.path.join(output_dir, f"confusion_matrix_{name}.png")
+    plt.savefig(confusion_plot_path, bbox_inches="tight")
+    plt.close()
+    return metrics_plot_path, confusion_plot_path
+
+# Function to save the results and recompute-ready logits of an evaluation run
+def save_results(results, logits, label_ids, name, output_dir=OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    logits_path = os.path.join(output_dir, f"logits_{name}.npz")
+    np.savez_compressed(logits_path, logits=logits, label_ids=label_ids, label_names=np.array(results["label_names"]))
+    with open(os.path.join(output_dir, f"evaluation_{name}.json"), "w") as f:
+        json.dump(results, f, indent=2)
+    save_plots(results, name, output_dir)
+    print(f"Evaluation results, logits and plots saved to '{output_dir}' ({name})")
+
+# Evaluation stage: one inference pass over the validation set with a Trainer; the
+# logits are cached and every metric, table and plot is computed from them
+def run_evaluation(trainer, val_dataset, label_names, name, output_dir=OUTPUT_DIR):
+    prediction = trainer.predict(val_dataset)
+    logits = np.asarray(prediction.predictions)
+    label_ids = np.asarray(prediction.label_ids)
+    results = evaluate_logits(logits, label_ids, label_names)
+    save_results(results, logits, label_ids, name, output_dir)
+    return results
+
+# Function to write the per-class metrics to an open metrics file
+def write_per_class(f, results):
+    f.write("\nPer-Class Metrics:\n")
+    for label, values in results["per_class"].items():
+        f.write(
+            f"{label}: precision {values['precision']:.4f}, recall {values['recall']:.4f}, "
+            f"f1 {values['f1']:.4f}, support {values['support']}\n"
+        )
+
+# Function to evaluate any saved model directory on the validation split without retraining
+def evaluate_model_dir(model_dir, tokenizer_dir, name, batch_size=32, output_dir=OUTPUT_DIR):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments
+    from training_data import PreTokenizedDataset, make_collator
+    from training_utils import FineTuneTrainer
+
+    _, val_texts, train_labels, val_labels = load_split()
+    label_names = sorted(set(train_labels) | set(val_labels))
+    label_map = {label: idx for idx, label in enumerate(label_names)}
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    val_dataset = PreTokenizedDataset.from_texts(val_texts, [label_map[label] for label in val_labels], tokenizer, max_len=128)
+
+    trainer = FineTuneTrainer(
+        model=model,
+        args=TrainingArguments(output_dir="./results_eval", per_device_eval_batch_size=batch_size, report_to=[]),
+        data_collator=make_collator(),
+    )
+    return run_evaluation(trainer, val_dataset, label_names, name, output_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a saved model on the validation split")
+    parser.add_argument("--model-dir", help="saved model directory, e.g. ./model/emotion_bert_model_1")
+    parser.add_argument("--tokenizer-dir", help="saved tokenizer directory (defaults to the model directory)")
+    parser.add_argument("--logits", help="recompute the results from a cached logits_<name>.npz instead of running the model")
+    parser.add_argument("--name", help="suffix for the output files (defaults to the model directory name)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    if args.logits:
+        cached = np.load(args.logits)
+        name = args.name or os.path.basename(args.logits)[len("logits_"):-len(".npz")]
+        results = evaluate_logits(cached["logits"], cached["label_ids"], cached["label_names"].tolist())
+        save_results(results, cached["logits"], cached["label_ids"], name, args.output_dir)
+    elif args.model_dir:
+        name = args.name or os.path.basename(os.path.normpath(args.model_dir))
+        results = evaluate_model_dir(args.model_dir, args.tokenizer_dir or args.model_dir, name, args.batch_size, args.output_dir)
+    else:
+        parser.error("either --model-dir or --logits is required")
+
+    for metric in ("accuracy", "precision", "recall", "f1"):
+        print(f"{metric}: {results[metric]:.4f}")
+
+if __name__ == "__main__":
+    main()
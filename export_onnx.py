@@ -0,0 +1,78 @@
+import argparse
+import os
+
+import torch
+from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import RobertaTokenizer, RobertaForSequenceClassification
+from transformers import AutoTokenizer, DistilBertForSequenceClassification, AutoModelForSequenceClassification
+
+import config
+
+# Models served by app.py, exported next to their directories as <model_dir>.onnx.
+# DistilBERT is the first stage of the cascade (CASCADE); the student is the model
+# distilled by train_distill.py (STUDENT).
+MODELS = {
+    "bert": (BertForSequenceClassification, "./model/emotion_bert_model_1", BertTokenizer, "./model/emotion_bert_tokenizer_1"),
+    "roberta": (RobertaForSequenceClassification, "./model/emotion_roberta_model_1", RobertaTokenizer, "./model/emotion_roberta_tokenizer_1"),
+    "distilbert": (DistilBertForSequenceClassification, "./model/emotion_distilbert_model_1", AutoTokenizer, "./model/emotion_distilbert_tokenizer_1"),
+    "student": (AutoModelForSequenceClassification, config.STUDENT_MODEL_DIR, AutoTokenizer, config.STUDENT_TOKENIZER_DIR),
+}
+
+# Wrapper that returns only the logits tensor, so the exported graph has a single output
+class LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+# Function to get the ONNX file path for a saved model directory
+def onnx_path(model_dir):
+    return os.path.normpath(model_dir) + ".onnx"
+
+# Function to export a saved model to ONNX with dynamic batch and sequence axes
+def export_model(model_class, model_dir, tokenizer_class, tokenizer_dir, output_path, opset):
+    model = model_class.from_pretrained(model_dir, num_labels=4)
+    model.eval()
+    tokenizer = tokenizer_class.from_pretrained(tokenizer_dir)
+    sample = tokenizer(
+        ["I feel down lately.", "I am scared about my exams next week."],
+        padding=True,
+        return_token_type_ids=False,
+        return_tensors="pt",
+    )
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsOnly(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            output_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    print(f"Exported '{model_dir}' to '{output_path}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ensemble models to ONNX")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS),
+                        help="models to export (default: every model whose directory exists)")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    if args.models is None:
+        args.models = [name for name in sorted(MODELS) if os.path.isdir(MODELS[name][1])]
+        skipped = sorted(set(MODELS) - set(args.models))
+        if skipped:
+            print(f"Skipping models that have not been trained: {', '.join(skipped)}")
+    for name in args.models:
+        model_class, model_dir, tokenizer_class, tokenizer_dir = MODELS[name]
+        export_model(model_class, model_dir, tokenizer_class, tokenizer_dir, onnx_path(model_dir), args.opset)
+
+if __name__ == "__main__":
+    main()
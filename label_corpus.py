@@ -0,0 +1,176 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Label the full verse corpus (csv1.csv) with the BERT + RoBERTa ensemble.
+# The CSV is streamed in chunks. Within a chunk the verses are sorted by length,
+# cut into batches, and the batches are spread over a pool of worker processes.
+# The workers are forked after the models are loaded, so they share the weights
+# copy-on-write. Each chunk is written to its own file, and the checkpoint is
+# updated after every chunk, so an interrupted run resumes at the first
+# unfinished chunk. At the end the chunk files are merged into one labels file.
+#
+#   python label_corpus.py --max-cores 8 --threads-per-worker 2
+#
+# The models are not run in the parent before the fork: the intra-op thread
+# pool they would start there does not survive it.
+
+SOURCE_PATH = "./dataset/csv1.csv"
+OUTPUT_DIR = "./cache/corpus_labels"
+CHECKPOINT_NAME = "checkpoint.json"
+LABELS_NAME = "corpus_labels.csv"
+
+
+# Function to set the thread budget of a pool worker
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+# Function to label one batch in a worker; returns the batch positions with the labels and probabilities
+def _label_batch(batch):
+    import app
+    positions, texts = batch
+    predicted_labels, probabilities = app.classify_emotion_ensemble_batch(texts, parallel=False)
+    return positions, predicted_labels, probabilities
+
+
+# Function to describe the run; a checkpoint is only resumed by a run with the same settings
+def run_settings(args):
+    return {
+        "source": os.path.abspath(args.source),
+        "source_size": os.path.getsize(args.source),
+        "source_mtime": os.path.getmtime(args.source),
+        "chunk_size": args.chunk_size,
+        "backend": config.BACKEND,
+        "quantize": config.QUANTIZE,
+    }
+
+
+def load_checkpoint(path, settings):
+    if not os.path.exists(path):
+        return {"settings": settings, "completed": {}}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["settings"] != settings:
+        raise SystemExit(f"Checkpoint '{path}' was written with different settings; use --restart to start over")
+    return checkpoint
+
+
+# Function to write a file atomically, so an interruption never leaves a partial file behind
+def write_atomic(path, write):
+    temporary_path = f"{path}.tmp"
+    write(temporary_path)
+    os.replace(temporary_path, path)
+
+
+# Function to label one chunk: length-sorted batches over the pool, results in input order
+def label_chunk(pool, chunk, batch_size, label_names):
+    texts = chunk["ayah_en"].fillna("").astype(str).tolist()
+    order = np.argsort([len(text) for text in texts], kind="stable")
+    batches = [
+        (positions, [texts[i] for i in positions])
+        for positions in (order[i:i + batch_size] for i in range(0, len(order), batch_size))
+    ]
+
+    predicted_labels = np.empty(len(texts), dtype=object)
+    probabilities = np.empty((len(texts), len(label_names)), dtype=np.float32)
+    for positions, batch_labels, batch_probabilities in pool.imap_unordered(_label_batch, batches):
+        predicted_labels[positions] = batch_labels
+        probabilities[positions] = batch_probabilities
+
+    labeled = chunk[["surah_no", "ayah_no_surah"]].copy()
+    labeled["label"] = predicted_labels
+    for column, name in enumerate(label_names):
+        labeled[f"prob_{name}"] = probabilities[:, column]
+    return labeled
+
+
+# Function to write the checkpoint file
+def save_checkpoint(path, checkpoint):
+    def write(temporary_path):
+        with open(temporary_path, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+    write_atomic(path, write)
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Label every verse of the corpus with the ensemble")
+    parser.add_argument("--source", default=SOURCE_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--chunk-size", type=int, default=512, help="verses per chunk (and checkpoint)")
+    parser.add_argument("--batch-size", type=int, default=32, help="verses per forward pass")
+    parser.add_argument("--max-cores", type=int, default=cpu_count, help="cores the job may use in total")
+    parser.add_argument("--threads-per-worker", type=int, default=2, help="intra-op threads per worker process")
+    parser.add_argument("--restart", action="store_true", help="discard the checkpoint and label everything again")
+    args = parser.parse_args()
+
+    threads = max(1, min(args.threads_per_worker, args.max_cores))
+    workers = max(1, args.max_cores // threads)
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, CHECKPOINT_NAME)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, run_settings(args))
+
+    # Load the ensemble once in the parent (no warmup, see above) and share it with the workers.
+    # The corpus is always labeled by BERT + RoBERTa, whatever the environment or serving
+    # profile selects for serving (the student replaces the ensemble and is loaded instead of it).
+    config.STUDENT = False
+    config.CASCADE = False
+    config.LAZY_LOADING = False
+    config.WARMUP_LENGTHS = []
+    config.VERSE_RETRIEVAL = "random"
+    config.SEARCH = False
+    config.VERSE_LOOKUP = False
+    import app
+    gc.collect()
+    gc.freeze()
+
+    print(f"Labeling '{args.source}' with {workers} workers x {threads} threads")
+    context = multiprocessing.get_context("fork")
+    labeled_verses = 0
+    start = time.perf_counter()
+    with context.Pool(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        columns = ["surah_no", "ayah_no_surah", "ayah_en"]
+        for chunk_id, chunk in enumerate(pd.read_csv(args.source, usecols=columns, chunksize=args.chunk_size)):
+            chunk_name = f"chunk_{chunk_id:05d}.csv"
+            if chunk_name in checkpoint["completed"]:
+                continue
+
+            chunk_start = time.perf_counter()
+            labeled = label_chunk(pool, chunk, args.batch_size, app.label_names.tolist())
+            write_atomic(os.path.join(args.output_dir, chunk_name), lambda path: labeled.to_csv(path, index=False))
+            chunk_seconds = time.perf_counter() - chunk_start
+
+            checkpoint["completed"][chunk_name] = {"verses": len(labeled), "seconds": chunk_seconds}
+            save_checkpoint(checkpoint_path, checkpoint)
+            labeled_verses += len(labeled)
+            print(f"{chunk_name}: {len(labeled)} verses in {chunk_seconds:.1f}s ({len(labeled) / chunk_seconds:.1f} verses/sec)")
+
+    elapsed = time.perf_counter() - start
+    if labeled_verses:
+        print(f"Labeled {labeled_verses} verses in {elapsed:.1f}s ({labeled_verses / elapsed:.1f} verses/sec)")
+    else:
+        print("Every chunk was already labeled")
+
+    # Merge the chunk files into one labels file
+    chunk_names = sorted(checkpoint["completed"])
+    labels = pd.concat([pd.read_csv(os.path.join(args.output_dir, name)) for name in chunk_names], ignore_index=True)
+    labels_path = os.path.join(args.output_dir, LABELS_NAME)
+    write_atomic(labels_path, lambda path: labels.to_csv(path, index=False))
+    print(f"{len(labels)} labeled verses saved to '{labels_path}'")
+    print(labels["label"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+import stage_timing
+
+# Prometheus metrics of the serving path, exposed by app.py on /metrics.
+# Stage latencies come from the stage_timing hooks; request, error and
+# per-emotion counters and the model-load timings are recorded by app.py.
+# Under serve_prefork.py, PROMETHEUS_MULTIPROC_DIR is set and /metrics
+# aggregates the metrics of all workers.
+
+# Buckets from 0.5 ms to 10 s; the stages of one request range from a
+# sub-millisecond verse lookup to forward passes of hundreds of milliseconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    "quranjar_stage_seconds",
+    "Time spent in one stage of a prediction",
+    ["stage", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "quranjar_request_seconds",
+    "Request latency by endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter("quranjar_requests_total", "Requests by endpoint and status code", ["endpoint", "status"])
+ERRORS = Counter("quranjar_errors_total", "Failed requests by endpoint and kind (client or server)", ["endpoint", "kind"])
+PREDICTIONS = Counter("quranjar_predictions_total", "Predicted emotions", ["emotion"])
+LOAD_SECONDS = Gauge(
+    "quranjar_load_seconds",
+    "Duration of each startup phase (model loading, warmup)",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+
+# Stage timing observer feeding the stage histogram
+def observe_stage(name, model, seconds):
+    STAGE_SECONDS.labels(name, model or "").observe(seconds)
+
+
+stage_timing.add_observer(observe_stage)
+
+
+# Function to record one finished request
+def observe_request(endpoint, status, seconds):
+    endpoint = endpoint or "unknown"
+    REQUEST_SECONDS.labels(endpoint).observe(seconds)
+    REQUESTS.labels(endpoint, str(status)).inc()
+    if status >= 500:
+        ERRORS.labels(endpoint, "server").inc()
+    elif status >= 400:
+        ERRORS.labels(endpoint, "client").inc()
+
+
+# Function to count the predicted emotions of one request
+def observe_predictions(emotions):
+    for emotion in emotions:
+        PREDICTIONS.labels(emotion).inc()
+
+
+def observe_load(phase, seconds):
+    LOAD_SECONDS.labels(phase).set(seconds)
+
+
+# Function to render all metrics in the Prometheus text format, with its content type
+def render():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import numpy as np
+import onnxruntime as ort
+import torch
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+# Function to build ONNX Runtime session options. A thread count of 0 keeps the runtime default.
+def make_session_options(intra_op_threads=0, inter_op_threads=0, execution_mode="sequential", graph_optimization="all"):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+    options.execution_mode = EXECUTION_MODES[execution_mode]
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+    return options
+
+
+# Sequence classifier backed by an ONNX Runtime CPU session. It is called like the
+# transformers model it was exported from, model(input_ids, attention_mask=...), and
+# returns an object with a `.logits` tensor, so it is a drop-in for the eager models.
+class OnnxSequenceClassifier:
+    def __init__(self, onnx_path, session_options=None):
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, sess_options=session_options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, input_ids, attention_mask=None):
+        input_ids = np.asarray(input_ids, dtype=np.int64)
+        if attention_mask is None:
+            attention_mask = np.ones_like(input_ids)
+        (logits,) = self.session.run(
+            ["logits"],
+            {"input_ids": input_ids, "attention_mask": np.asarray(attention_mask, dtype=np.int64)},
+        )
+        return SimpleNamespace(logits=torch.from_numpy(logits))
@@ -0,0 +1,132 @@
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Rough per-entry bookkeeping overhead (OrderedDict node, tuple, floats), in bytes
+ENTRY_OVERHEAD_BYTES = 200
+
+
+# Function to normalize input text into a cache key: NFKC, runs of whitespace
+# collapsed to one space and, optionally, case folding. The key is also the text
+# that gets classified, so every input with the same key gets the same prediction.
+# RoBERTa is case-sensitive, so case folding is off by default.
+def normalize_text(text, case_insensitive=False):
+    text = " ".join(unicodedata.normalize("NFKC", text).split())
+    return text.casefold() if case_insensitive else text
+
+
+# Function to estimate the memory held by a cached value
+def estimate_size(key, value):
+    size = ENTRY_OVERHEAD_BYTES + len(key.encode("utf-8"))
+    for part in value if isinstance(value, tuple) else (value,):
+        size += getattr(part, "nbytes", None) or sys.getsizeof(part)
+    return size
+
+
+# Bounded LRU cache with an optional TTL and in-flight request coalescing.
+# Concurrent misses for the same key wait for a single computation instead of
+# each running it. Failed computations are not cached.
+class PredictionCache:
+    def __init__(self, max_entries=10000, max_bytes=0, ttl_seconds=0.0, case_insensitive=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.case_insensitive = case_insensitive
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Return the cached value for `text`, computing it on a miss with `compute_fn` applied
+    # to the normalized text, so the cached value is right for every input with that key
+    def get_or_compute(self, text, compute_fn):
+        key = normalize_text(text, self.case_insensitive)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute_fn(key)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._insert(key, value)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+    def _insert(self, key, value):
+        if key in self._entries:
+            self._remove(key)
+        size = estimate_size(key, value)
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        while self._entries and (
+            (self.max_entries > 0 and len(self._entries) > self.max_entries)
+            or (self.max_bytes > 0 and self._bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
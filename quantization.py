@@ -0,0 +1,44 @@
+import logging
+import os
+
+import torch
+
+logger = logging.getLogger("quranjar.quantization")
+
+
+# Function to apply INT8 dynamic quantization to the linear layers of a model
+def quantize_model(model):
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# Function to get the path of the cached quantized artifact for a saved model directory
+def quantized_cache_path(model_dir):
+    return os.path.normpath(model_dir) + "_int8.pt"
+
+
+# Function to check whether the cached artifact is newer than every file of the source model
+def _cache_is_fresh(cache_path, model_dir):
+    if not os.path.exists(cache_path):
+        return False
+    cache_mtime = os.path.getmtime(cache_path)
+    return all(
+        os.path.getmtime(os.path.join(model_dir, name)) <= cache_mtime
+        for name in os.listdir(model_dir)
+    )
+
+
+# Function to load an INT8 dynamic-quantized model, building and caching it on the first run.
+# The artifact is written next to the model directory and rebuilt when the source model changes.
+def load_quantized_model(model_class, model_dir, num_labels=4, cache_path=None):
+    cache_path = cache_path or quantized_cache_path(model_dir)
+    if _cache_is_fresh(cache_path, model_dir):
+        model = torch.load(cache_path, weights_only=False)
+        model.eval()
+        return model
+
+    model = model_class.from_pretrained(model_dir, num_labels=num_labels)
+    quantized_model = quantize_model(model)
+    torch.save(quantized_model, cache_path)
+    logger.info(f"Saved quantized model to '{cache_path}'", extra={"fields": {"model_dir": model_dir, "cache_path": cache_path}})
+    return quantized_model
@@ -0,0 +1,131 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+# Full-text verse search. An inverted index is built once over the English
+# translation and a diacritic-normalized form of the Arabic text of every verse.
+# Each posting stores its precomputed BM25 weight, so scoring a query term is a
+# single vectorized add over the verses that contain it. The last query term
+# also matches as a prefix (from MIN_PREFIX_LENGTH characters), for
+# search-as-you-type clients.
+
+# Arabic harakat, Quranic annotation marks, superscript alef and tatweel
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+# Letter variants folded to one form: hamza carriers and wasla to bare alef, alef maqsura to ya,
+# ta marbuta to ha
+_ARABIC_FOLDS = str.maketrans({
+    "\u0622": "\u0627", "\u0623": "\u0627", "\u0625": "\u0627", "\u0671": "\u0627",
+    "\u0649": "\u064a", "\u0629": "\u0647", "\u0624": "\u0648", "\u0626": "\u064a",
+})
+_TOKEN = re.compile(r"\w+")
+MIN_PREFIX_LENGTH = 3
+
+
+# Function to strip diacritics and fold letter variants of Arabic text
+def normalize_arabic(text):
+    return _ARABIC_MARKS.sub("", unicodedata.normalize("NFKC", text)).translate(_ARABIC_FOLDS)
+
+
+# Function to split text into normalized search terms (English and Arabic alike)
+def tokenize(text):
+    return _TOKEN.findall(normalize_arabic(text).casefold())
+
+
+# Inverted index over the verse corpus (see verse_corpus.py)
+class SearchIndex:
+    def __init__(self, postings, size, rows_by_label, k1=1.2, b=0.75):
+        self.postings = postings
+        self.terms = sorted(postings)
+        self.size = size
+        self.label_masks = {}
+        for label, rows in rows_by_label.items():
+            mask = np.zeros(size, dtype=bool)
+            mask[rows] = True
+            self.label_masks[label] = mask
+        self.k1 = k1
+        self.b = b
+
+    # Build the index: one posting list per term with the BM25 weight of the term in each verse
+    @classmethod
+    def from_corpus(cls, corpus, k1=1.2, b=0.75):
+        documents = [
+            tokenize(english) + tokenize(arabic)
+            for english, arabic in zip(corpus["ayah_en"].tolist(), corpus["ayah_ar"].tolist())
+        ]
+        lengths = np.array([len(terms) for terms in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+        frequencies = {}
+        for row, terms in enumerate(documents):
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                frequencies.setdefault(term, ([], []))
+                frequencies[term][0].append(row)
+                frequencies[term][1].append(count)
+
+        postings = {}
+        for term, (rows, counts) in frequencies.items():
+            rows = np.asarray(rows, dtype=np.int32)
+            counts = np.asarray(counts, dtype=np.float32)
+            idf = np.log(1.0 + (len(documents) - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[rows] / average_length)
+            postings[term] = (rows, (idf * counts * (k1 + 1.0) / (counts + norm)).astype(np.float32))
+
+        rows_by_label = {}
+        for row, labels in enumerate(corpus["labels"].tolist()):
+            for label in labels:
+                rows_by_label.setdefault(label, []).append(row)
+        return cls(postings, len(documents), rows_by_label, k1, b)
+
+    # Posting lists of a query term; with `prefix` every indexed term starting with it
+    def _lookup(self, term, prefix=False):
+        if not prefix or len(term) < MIN_PREFIX_LENGTH:
+            posting = self.postings.get(term)
+            return [posting] if posting is not None else []
+        start = bisect.bisect_left(self.terms, term)
+        end = bisect.bisect_left(self.terms, term + "\uffff")
+        return [self.postings[match] for match in self.terms[start:end]]
+
+    # Return (rows, scores, total) of one page of matches, best first. With match="all" a
+    # verse must contain every term, with "any" at least one. `label` keeps only the verses
+    # of that emotion. The last term matches as a prefix when `prefix` is set.
+    def search(self, query, label=None, match="all", page=1, page_size=10, prefix=True):
+        terms = list(dict.fromkeys(tokenize(query)))
+        empty = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32), 0
+        if not terms:
+            return empty
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched_terms = np.zeros(self.size, dtype=np.int16)
+        for position, term in enumerate(terms):
+            postings = self._lookup(term, prefix=prefix and position == len(terms) - 1)
+            if not postings:
+                if match == "all":
+                    return empty
+                continue
+            term_hits = np.zeros(self.size, dtype=bool)
+            for rows, weights in postings:
+                scores[rows] += weights
+                term_hits[rows] = True
+            matched_terms += term_hits
+
+        selected = matched_terms == len(terms) if match == "all" else matched_terms > 0
+        if label is not None:
+            mask = self.label_masks.get(label)
+            if mask is None:
+                return empty
+            selected &= mask
+        rows = np.flatnonzero(selected).astype(np.int32)
+        total = len(rows)
+
+        # Rank by score, ties in corpus (surah, verse) order
+        order = np.lexsort((rows, -scores[rows]))
+        page_rows = rows[order[(page - 1) * page_size:page * page_size]]
+        return page_rows, scores[page_rows], total
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,160 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# Semantic verse retrieval. Every verse's English translation is embedded once
+# offline (`python semantic_index.py`) with a sentence-embedding model. The
+# L2-normalized embeddings are stored as a float16 .npy matrix. At startup it is
+# converted to float32 once, in the pre-fork master, so the workers share the
+# pages copy-on-write and never write to them. At request time the user's text
+# is embedded with the same model and the top-k verses by cosine similarity come
+# from one matrix-vector product, optionally restricted to the verses of one
+# emotion.
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INDEX_DIR = "./cache/verse_embeddings"
+INDEX_VERSION = 1
+# Per-query latency budget of a top-k lookup, checked by the benchmark and the tests
+QUERY_BUDGET_MS = 1.0
+
+
+# Sentence embeddings: mean of the model's last hidden states over the
+# non-padding tokens, L2-normalized so that dot products are cosine similarities
+class TextEmbedder:
+    def __init__(self, model_name=EMBEDDING_MODEL, max_length=128):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+
+    def embed(self, texts, batch_size=64):
+        import torch
+
+        texts = list(texts)
+        embeddings = []
+        for i in range(0, len(texts), batch_size):
+            encoding = self.tokenizer(
+                texts[i:i + batch_size],
+                max_length=self.max_length,
+                truncation=True,
+                padding="longest",
+                return_tensors="pt",
+            )
+            with torch.no_grad():
+                hidden_states = self.model(**encoding).last_hidden_state
+            mask = encoding["attention_mask"].unsqueeze(-1).to(hidden_states.dtype)
+            pooled = (hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp_min(1e-9)
+            embeddings.append(torch.nn.functional.normalize(pooled, dim=1).numpy())
+        return np.concatenate(embeddings).astype(np.float32)
+
+
+# Function to hash the verse keys and texts an index was built from
+def corpus_hash(keys, texts):
+    digest = hashlib.sha256()
+    for (surah_no, ayah_no), text in zip(keys, texts):
+        digest.update(f"{surah_no}:{ayah_no}\0{text}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Function to embed the corpus and write the index files (metadata last)
+def build_index(corpus, embedder, index_dir=INDEX_DIR, batch_size=64):
+    keys = corpus[["surah_no", "ayah_no_surah"]].to_numpy(dtype=np.int16)
+    texts = corpus["ayah_en"].tolist()
+    embeddings = embedder.embed(texts, batch_size=batch_size)
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "embeddings.npy"), embeddings.astype(np.float16))
+    np.save(os.path.join(index_dir, "keys.npy"), keys)
+    meta = {
+        "version": INDEX_VERSION,
+        "model": embedder.model_name,
+        "size": len(texts),
+        "dim": int(embeddings.shape[1]),
+        "corpus_hash": corpus_hash(keys.tolist(), texts),
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+# Embedding index over the verse corpus. `labels` holds each row's emotions; the
+# float32 rows of each emotion are copied into their own matrix up front, so a
+# filtered query only scores those rows.
+class SemanticIndex:
+    def __init__(self, embeddings, keys, meta, labels=None):
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.keys = keys
+        self.meta = meta
+        self.rows_by_label = {}
+        for row, row_labels in enumerate(labels if labels is not None else []):
+            for label in row_labels:
+                self.rows_by_label.setdefault(label, []).append(row)
+        self.rows_by_label = {label: np.asarray(rows, dtype=np.int64) for label, rows in self.rows_by_label.items()}
+        self.embeddings_by_label = {label: self.embeddings[rows] for label, rows in self.rows_by_label.items()}
+
+    # Load the index files; the float16 embeddings are read through a memory map and
+    # converted to float32 once. Raises FileNotFoundError when the index has not been built.
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR, labels=None):
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Semantic index in '{index_dir}' has version {meta.get('version')}, expected {INDEX_VERSION}")
+        embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+        keys = np.load(os.path.join(index_dir, "keys.npy"), mmap_mode="r")
+        return cls(embeddings, keys, meta, labels)
+
+    # Return the cosine similarity of the query with every verse
+    def scores(self, query_embedding):
+        return self.embeddings @ np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+
+    # Return (rows, scores) of the k most similar verses, best first, optionally only
+    # among the verses labeled with `label`
+    def search(self, query_embedding, k=5, label=None):
+        if label is None:
+            rows = None
+            scores = self.scores(query_embedding)
+        else:
+            rows = self.rows_by_label.get(label)
+            if rows is None:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            scores = self.embeddings_by_label[label] @ np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top])]
+        return (top if rows is None else rows[top]), scores[top]
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed every verse of the corpus into the semantic index")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    from verse_corpus import load_verse_corpus
+
+    corpus = load_verse_corpus()
+    start = time.perf_counter()
+    meta = build_index(corpus, TextEmbedder(args.model), args.index_dir, args.batch_size)
+    print(f"Embedded {meta['size']} verses ({meta['dim']} dimensions) in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    SemanticIndex.load(args.index_dir)
+    print(f"Index saved to '{args.index_dir}', loads in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import config
+
+# Pre-fork serving: the master process loads the models and the verse table
+# once, then forks workers that share that memory copy-on-write and accept
+# connections on one listening socket. Each worker gets its own intra-op thread
+# budget (and optionally its own cores), so the workers together do not
+# oversubscribe the CPU. Dead workers are restarted.
+#
+#   python serve_prefork.py --workers 4 --threads-per-worker 2
+#
+# Warmup runs in every worker after the fork: running the models in the master
+# would start the intra-op thread pool there, and that pool does not survive a fork.
+
+# Function to configure a freshly forked worker and serve requests on the shared socket
+def run_worker(app_module, sock, worker_id, args, warmup_lengths):
+    import torch
+    from werkzeug.serving import make_server
+
+    torch.set_num_threads(args.threads_per_worker)
+    if args.pin_cores and hasattr(os, "sched_setaffinity"):
+        cpu_count = os.cpu_count() or 1
+        first = worker_id * args.threads_per_worker
+        cores = {core % cpu_count for core in range(first, first + args.threads_per_worker)}
+        os.sched_setaffinity(0, cores)
+
+    config.WARMUP_LENGTHS = warmup_lengths
+    if warmup_lengths:
+        app_module.warmup()
+
+    server = make_server(args.host, args.port, app_module.app, threaded=args.threaded, fd=sock.fileno())
+    app_module.logger.info(
+        f"Worker {worker_id} serving on {args.host}:{args.port}",
+        extra={"fields": {"worker": worker_id, "threads": args.threads_per_worker}},
+    )
+    server.serve_forever()
+
+
+# Function to fork one worker and return its pid in the master
+def spawn_worker(app_module, sock, worker_id, args, warmup_lengths):
+    pid = os.fork()
+    if pid == 0:
+        # Restore default signal handling in the worker; the master handles shutdown
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            run_worker(app_module, sock, worker_id, args, warmup_lengths)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serve app.py from pre-forked workers sharing the loaded models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=max(1, cpu_count // 2))
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--pin-cores", action="store_true", help="pin each worker to its own cores")
+    parser.add_argument("--threaded", action="store_true",
+                        help="handle requests on threads inside each worker (useful with micro-batching)")
+    parser.add_argument("--backlog", type=int, default=128)
+    args = parser.parse_args(argv)
+    if args.threads_per_worker <= 0:
+        args.threads_per_worker = max(1, cpu_count // args.workers)
+
+    # Prometheus metrics of all workers are aggregated through files in this directory
+    if config.METRICS and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="quranjar_metrics_")
+
+    # Load everything in the master, without warming up
+    warmup_lengths = config.WARMUP_LENGTHS
+    config.WARMUP_LENGTHS = []
+    config.LAZY_LOADING = False
+    import app as app_module
+
+    # Move the loaded objects out of the garbage collector's generations so that
+    # collections in the workers do not write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog, reuse_port=False)
+    sock.set_inheritable(True)
+
+    workers = {}
+    for worker_id in range(args.workers):
+        workers[spawn_worker(app_module, sock, worker_id, args, warmup_lengths)] = worker_id
+    app_module.logger.info(
+        f"Master {os.getpid()} started {args.workers} workers with {args.threads_per_worker} threads each",
+        extra={"fields": {"workers": sorted(workers), "threads_per_worker": args.threads_per_worker}},
+    )
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = workers.pop(pid, None)
+        if worker_id is None:
+            continue
+        if app_module.metrics is not None:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid)
+        if not stopping:
+            app_module.logger.warning(
+                f"Worker {worker_id} (pid {pid}) exited with status {status}, restarting",
+                extra={"fields": {"worker": worker_id, "pid": pid, "status": status}},
+            )
+            time.sleep(1)
+            workers[spawn_worker(app_module, sock, worker_id, args, warmup_lengths)] = worker_id
+    sock.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
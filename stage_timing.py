@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Per-stage timing hooks for the serving path. app.py wraps each stage of a
+# prediction (tokenization, each model's forward pass, ensembling, verse lookup)
+# in `stage(...)`. Observers registered with `add_observer` are called with
+# (stage, model, seconds) after every stage; `model` is None for stages that do
+# not belong to one model. Without observers a stage only costs a list check.
+
+_observers = []
+
+
+def add_observer(observer):
+    _observers.append(observer)
+
+
+def remove_observer(observer):
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+@contextmanager
+def stage(name, model=None):
+    if not _observers:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for observer in list(_observers):
+            observer(name, model, elapsed)
+
+
+# Observer that keeps every stage timing in memory, for benchmarks
+class StageRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+
+    def __call__(self, name, model, seconds):
+        key = name if model is None else f"{name}:{model}"
+        with self._lock:
+            self._timings.setdefault(key, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+
+    # Per-stage call count, total time and latency percentiles in milliseconds
+    def summary(self):
+        with self._lock:
+            timings = {key: np.asarray(values) * 1000.0 for key, values in self._timings.items()}
+        total_ms = sum(float(values.sum()) for values in timings.values())
+        return {
+            key: {
+                "count": int(values.size),
+                "total_ms": float(values.sum()),
+                "share": float(values.sum()) / total_ms if total_ms else 0.0,
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+            }
+            for key, values in sorted(timings.items())
+        }
@@ -0,0 +1,93 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Structured logging for the service. Records are formatted as one JSON object
+# per line and written by a background listener thread, so a log call on the
+# request path only puts the record on a queue. Per-request records go to the
+# "quranjar.requests" logger, which keeps only a sample of them.
+
+LOGGER_NAME = "quranjar"
+REQUEST_LOGGER_NAME = "quranjar.requests"
+
+
+# Formatter writing the message and the record's `fields` (passed with extra={"fields": ...}) as JSON
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Filter keeping a random `rate` share of records below WARNING; warnings and errors always pass
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+_listener = None
+
+
+# The listener thread does not survive a fork. The child gets a new queue (records still
+# queued at the fork are written by the parent) and a new listener thread.
+def _restart_listener_in_child():
+    global _listener
+    if _listener is not None:
+        log_queue = queue.SimpleQueue()
+        for handler in logging.getLogger(LOGGER_NAME).handlers:
+            if isinstance(handler, QueueHandler):
+                handler.queue = log_queue
+        _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+atexit.register(_stop_listener)
+
+
+# Function to route the service loggers through a queue to a JSON stream handler
+def setup_logging(level="INFO", sample_rate=1.0, stream=None):
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    _stop_listener()
+    logger.handlers.clear()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+    request_logger.filters.clear()
+    request_logger.addFilter(SamplingFilter(sample_rate))
+    return logger
@@ -2,7 +2,7 @@ from transformers import BertTokenizer, BertForSequenceClassification
 from transformers import RobertaTokenizer, RobertaForSequenceClassification
 # from transformers import AutoTokenizer, DistilBertForSequenceClassification
 import torch
-import pandas as pd
+from verse_store import load_dataframe
 
 # Load the fine-tuned BERT model and tokenizer
 bert_model = BertForSequenceClassification.from_pretrained("./model/emotion_bert_model_1", num_labels=4)
@@ -15,9 +15,9 @@ roberta_tokenizer = RobertaTokenizer.from_pretrained("./model/emotion_roberta_to
 # Load the label map
 label_map = {"anger": 0, "fear": 1, "joy": 2, "sadness": 3}  # Replace with your actual label map
 
-# Load the dataset containing Quranic verses and emotions
+# Load the dataset containing Quranic verses and emotions (from the verse store when it is built)
 def load_quran_dataset(file_path):
-    df = pd.read_csv(file_path)
+    df = load_dataframe(file_path, columns=["surah_no", "ayah_no_surah", "label", "ayah_en"])
     return df
 
 # Function to classify emotion using BERT
@@ -27,7 +27,7 @@ def classify_emotion_bert(user_input):
         add_special_tokens=True,
         max_length=128,
         return_token_type_ids=False,
-        padding="max_length",
+        padding="longest",
         truncation=True,
         return_attention_mask=True,
         return_tensors="pt",
@@ -45,7 +45,7 @@ def classify_emotion_roberta(user_input):
         add_special_tokens=True,
         max_length=128,
         return_token_type_ids=False,
-        padding="max_length",
+        padding="longest",
         truncation=True,
         return_attention_mask=True,
         return_tensors="pt",
@@ -0,0 +1,45 @@
+import numpy as np
+
+import app
+from export_onnx import onnx_path
+from onnx_backend import OnnxSequenceClassifier
+
+# Run `python export_onnx.py` first. Checks that the ONNX Runtime backend gives the
+# same probabilities as the eager PyTorch models.
+
+# Largest allowed absolute difference between torch and ONNX probabilities
+TOLERANCE = 1e-4
+
+TEXTS = [
+    "I feel down lately.",
+    "I am so angry at my brother for what he said to me yesterday.",
+    "I am scared about my exams next week and I cannot sleep at night because of it.",
+    "Today was a wonderful day, I spent the afternoon with my family and we laughed a lot.",
+]
+
+# Load the exported ONNX models
+bert_onnx = OnnxSequenceClassifier(onnx_path("./model/emotion_bert_model_1"))
+roberta_onnx = OnnxSequenceClassifier(onnx_path("./model/emotion_roberta_model_1"))
+
+# Function to compare one model's torch and ONNX probabilities on single inputs and a padded batch
+def check_parity(name, torch_model, onnx_model, tokenizer):
+    batches = [[text] for text in TEXTS] + [TEXTS]
+    max_diff = 0.0
+    for batch in batches:
+        torch_probabilities = app.classify_emotion_batch(torch_model, tokenizer, batch)
+        onnx_probabilities = app.classify_emotion_batch(onnx_model, tokenizer, batch)
+        assert torch_probabilities.shape == onnx_probabilities.shape
+        max_diff = max(max_diff, float(np.abs(torch_probabilities - onnx_probabilities).max()))
+    print(f"{name}: max |p_torch - p_onnx| = {max_diff:.2e}")
+    assert max_diff <= TOLERANCE, f"{name} ONNX probabilities differ from torch by {max_diff:.2e}"
+
+def test_bert_parity():
+    check_parity("BERT", app.bert_model, bert_onnx, app.bert_tokenizer)
+
+def test_roberta_parity():
+    check_parity("RoBERTa", app.roberta_model, roberta_onnx, app.roberta_tokenizer)
+
+if __name__ == "__main__":
+    test_bert_parity()
+    test_roberta_parity()
+    print("ONNX backend matches the torch backend.")
@@ -1,6 +1,6 @@
 from transformers import BertTokenizer, BertForSequenceClassification
 import torch
-import pandas as pd
+from verse_store import load_dataframe
 
 # Load the fine-tuned BERT model and tokenizer
 model = BertForSequenceClassification.from_pretrained("./model/emotion_bert_model_1")
@@ -9,9 +9,9 @@ tokenizer = BertTokenizer.from_pretrained("./model/emotion_bert_tokenizer_1")
 # Load the label map
 label_map = {"anger": 0, "fear": 1, "joy": 2, "sadness": 3}  # Replace with your actual label map
 
-# Load the dataset containing Quranic verses and emotions
+# Load the dataset containing Quranic verses and emotions (from the verse store when it is built)
 def load_quran_dataset(file_path):
-    df = pd.read_csv(file_path)
+    df = load_dataframe(file_path, columns=["surah_no", "ayah_no_surah", "label", "ayah_en"])
     return df
 
 # Function to classify emotion
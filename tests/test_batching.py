@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+from worker_pool import DeadlineExceeded
+
+
+# Stub batch_fn: records each batch and blocks until released
+class BlockingBatchFn:
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        return [item * 2 for item in items]
+
+
+@pytest.fixture
+def batch_fn():
+    batch_fn = BlockingBatchFn()
+    yield batch_fn
+    batch_fn.release.set()
+
+
+def test_concurrent_items_share_a_batch():
+    batches = []
+    batcher = MicroBatcher(lambda items: batches.append(list(items)) or [item * 2 for item in items], max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(item) for item in range(4)]
+    assert [future.result(5) for future in futures] == [0, 2, 4, 6]
+    assert batches == [[0, 1, 2, 3]]
+
+
+def test_expired_item_never_reaches_batch_fn(batch_fn):
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0)
+    # Occupy the batcher so the next items wait in its queue
+    first = batcher.submit(0)
+    assert batch_fn.started.wait(5)
+    expired = batcher.submit(1, deadline=time.monotonic() + 0.01)
+    live = batcher.submit(2, deadline=time.monotonic() + 5)
+    time.sleep(0.05)
+    batch_fn.release.set()
+
+    with pytest.raises(DeadlineExceeded):
+        expired.result(5)
+    assert first.result(5) == 0
+    assert live.result(5) == 4
+    assert batch_fn.batches == [[0], [2]]
+    assert batcher.stats()["expired"] == 1
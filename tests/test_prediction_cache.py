@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache, estimate_size
+
+
+# Clock that only moves when the test advances it
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+    return clock
+
+
+# Function to wait until `condition()` holds, failing the test after `timeout` seconds
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.001)
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = PredictionCache()
+    release = threading.Event()
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        release.wait(5)
+        return text.upper()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("same text", compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.stats()["coalesced"] == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["same text"]
+    assert results == ["SAME TEXT"] * 8
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["inflight"] == 0
+
+
+def test_failed_computation_is_shared_and_not_cached():
+    cache = PredictionCache()
+    release = threading.Event()
+    error = RuntimeError("model error")
+
+    def fail(text):
+        release.wait(5)
+        raise error
+
+    raised = []
+
+    def call():
+        try:
+            cache.get_or_compute("text", fail)
+        except RuntimeError as exc:
+            raised.append(exc)
+
+    owner = threading.Thread(target=call)
+    owner.start()
+    wait_for(lambda: cache.stats()["inflight"] == 1)
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    wait_for(lambda: cache.stats()["coalesced"] == 1)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert raised == [error, error]
+    assert cache.get_or_compute("text", str.upper) == "TEXT"
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(ttl_seconds=10.0)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return len(calls)
+
+    assert cache.get_or_compute("text", compute) == 1
+    clock.now += 9.0
+    assert cache.get_or_compute("text", compute) == 1
+    clock.now += 2.0
+    assert cache.get_or_compute("text", compute) == 2
+    assert len(calls) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_byte_limit_evicts_least_recently_used():
+    entry_size = estimate_size("a", "value")
+    cache = PredictionCache(max_entries=0, max_bytes=2 * entry_size)
+    for key in ("a", "b"):
+        cache.get_or_compute(key, lambda text: "value")
+    cache.get_or_compute("a", lambda text: "other")  # hit: "a" becomes the most recently used
+    cache.get_or_compute("c", lambda text: "value")
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 2 * entry_size
+    assert cache.get_or_compute("a", lambda text: "recomputed") == "value"
+    assert cache.get_or_compute("b", lambda text: "recomputed") == "recomputed"
+
+
+def test_entry_limit_evicts_oldest():
+    cache = PredictionCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, str.upper)
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_compute("a", lambda text: "recomputed") == "recomputed"
+
+
+def test_compute_fn_gets_the_normalized_text():
+    cache = PredictionCache(case_insensitive=True)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return text
+
+    assert cache.get_or_compute("  Hello\tWORLD ", compute) == "hello world"
+    assert cache.get_or_compute("hello world", compute) == "hello world"
+    assert calls == ["hello world"]
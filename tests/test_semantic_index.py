@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pytest
+
+from semantic_index import QUERY_BUDGET_MS, SemanticIndex
+
+# Size of the full verse corpus and of the embeddings of all-MiniLM-L6-v2
+VERSES = 6236
+DIM = 384
+EMOTIONS = ["anger", "fear", "joy", "sadness"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(VERSES, DIM)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    keys = np.stack([np.arange(VERSES) // 100 + 1, np.arange(VERSES) % 100 + 1], axis=1).astype(np.int16)
+    labels = [[EMOTIONS[row % len(EMOTIONS)]] if row % 3 == 0 else [] for row in range(VERSES)]
+    return SemanticIndex(embeddings.astype(np.float16), keys, {"dim": DIM}, labels)
+
+
+def test_embeddings_are_float32(index):
+    assert index.embeddings.dtype == np.float32
+    assert all(matrix.dtype == np.float32 for matrix in index.embeddings_by_label.values())
+
+
+def test_search_ranks_closest_first(index):
+    rows, scores = index.search(index.embeddings[42], k=5)
+    assert rows[0] == 42
+    assert len(rows) == 5
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_filtered_search_only_returns_the_emotion(index):
+    rows, scores = index.search(index.embeddings[9], k=5, label="fear")
+    assert rows[0] == 9
+    assert set(rows.tolist()) <= set(index.rows_by_label["fear"].tolist())
+    np.testing.assert_allclose(scores, index.scores(index.embeddings[9])[rows], rtol=1e-5)
+
+
+def test_unknown_emotion_returns_nothing(index):
+    rows, scores = index.search(index.embeddings[0], k=5, label="surprise")
+    assert len(rows) == 0 and len(scores) == 0
+
+
+@pytest.mark.parametrize("label", [None, "joy"])
+def test_query_within_budget(index, label):
+    queries = index.embeddings[:200]
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, k=3, label=label)
+        best = min(best, (time.perf_counter() - start) / len(queries))
+    assert best * 1000 < QUERY_BUDGET_MS
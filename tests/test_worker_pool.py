@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from worker_pool import BoundedWorkerPool, DeadlineExceeded, QueueFull
+
+
+# Function to wait until `condition()` holds, failing the test after `timeout` seconds
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.001)
+
+
+# Stub task: records its items and blocks until released
+class BlockingTask:
+    def __init__(self):
+        self.release = threading.Event()
+        self.items = []
+
+    def __call__(self, item):
+        self.items.append(item)
+        self.release.wait(5)
+        return item * 2
+
+
+@pytest.fixture
+def task():
+    task = BlockingTask()
+    yield task
+    task.release.set()
+
+
+def test_runs_items():
+    pool = BoundedWorkerPool(lambda item: item * 2, workers=2)
+    assert [pool(item) for item in range(5)] == [0, 2, 4, 6, 8]
+    assert pool.stats()["completed"] == 5
+
+
+def test_full_queue_is_rejected_with_retry_after(task):
+    pool = BoundedWorkerPool(task, workers=1, max_queue_size=1)
+    running = pool.submit(1)
+    wait_for(lambda: pool.stats()["busy_workers"] == 1)
+    queued = pool.submit(2)
+
+    with pytest.raises(QueueFull) as excinfo:
+        pool.submit(3)
+    assert excinfo.value.retry_after >= 1
+    assert pool.stats()["rejected"] == 1
+
+    task.release.set()
+    assert running.result(5) == 2
+    assert queued.result(5) == 4
+    assert task.items == [1, 2]
+
+
+def test_retry_after_covers_the_queue(task):
+    pool = BoundedWorkerPool(task, workers=1, max_queue_size=2)
+    # Mean service time of 3s per item, as if measured on earlier requests
+    pool._completed, pool._service_time = 1, 3.0
+    pool.submit(1)
+    wait_for(lambda: pool.stats()["busy_workers"] == 1)
+    pool.submit(2)
+    pool.submit(3)
+    with pytest.raises(QueueFull) as excinfo:
+        pool.submit(4)
+    assert excinfo.value.retry_after == 6
+
+
+def test_missed_deadline_raises_and_skips_the_item(task):
+    pool = BoundedWorkerPool(task, workers=1, max_queue_size=4)
+    pool.submit(1)
+    wait_for(lambda: pool.stats()["busy_workers"] == 1)
+
+    with pytest.raises(DeadlineExceeded):
+        pool(2, deadline=time.monotonic() + 0.05)
+
+    task.release.set()
+    # Dropped as expired or as cancelled, whichever the worker sees first
+    wait_for(lambda: pool.stats()["expired"] + pool.stats()["cancelled"] == 1)
+    assert task.items == [1]
+
+
+def test_expired_item_is_dropped_in_the_queue(task):
+    pool = BoundedWorkerPool(task, workers=1, max_queue_size=4)
+    pool.submit(1)
+    wait_for(lambda: pool.stats()["busy_workers"] == 1)
+    expired = pool.submit(2, deadline=time.monotonic() - 1.0)
+
+    task.release.set()
+    with pytest.raises(DeadlineExceeded):
+        expired.result(5)
+    assert pool.stats()["expired"] == 1
+    assert task.items == [1]
+
+
+def test_task_errors_reach_the_caller():
+    def fail(item):
+        raise ValueError("bad input")
+
+    pool = BoundedWorkerPool(fail, workers=1)
+    with pytest.raises(ValueError):
+        pool(1)
+    wait_for(lambda: pool.stats()["errors"] == 1)
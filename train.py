@@ -0,0 +1,357 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+import torch
+from transformers import BertTokenizer, BertForSequenceClassification
+from transformers import RobertaTokenizer, RobertaForSequenceClassification
+from transformers import AutoTokenizer, DistilBertForSequenceClassification
+from transformers import TrainerCallback, TrainingArguments
+
+from evaluate import classification_metrics, load_split, run_evaluation, write_per_class
+from training_data import PreTokenizedDataset, make_collator
+from training_utils import FineTuneTrainer, add_training_options, write_throughput
+
+# Fine-tune one of the supported backbones on the Quran emotions dataset, either as a
+# single run (which saves the model next to the others in ./model) or as a grid or
+# random hyperparameter sweep run by parallel worker processes.
+#
+#   python train.py --backbone roberta
+#   python train.py --backbone bert --sweep grid --learning-rates 2e-5,3e-5,5e-5 --workers 2
+
+# Backbones: tokenizer class, model class, pretrained checkpoint, display name and
+# the results/logs directories the original per-backbone scripts used
+BACKBONES = {
+    "bert": (BertTokenizer, BertForSequenceClassification, "bert-base-uncased", "BERT", "./results", "./logs"),
+    "roberta": (RobertaTokenizer, RobertaForSequenceClassification, "roberta-base", "RoBERTa", "./results_roberta", "./logs_roberta"),
+    "distilbert": (AutoTokenizer, DistilBertForSequenceClassification, "distilbert-base-uncased", "DistilBERT", "./results_distilbert", "./logs_distilbert"),
+}
+
+# Default hyperparameters of a single run
+DEFAULT_HPARAMS = {
+    "learning_rate": 5e-5,
+    "num_train_epochs": 3,
+    "warmup_steps": 500,
+    "weight_decay": 0.01,
+}
+
+LEADERBOARD_PATH = "./eval_metrics/leaderboard.csv"
+LEADERBOARD_FIELDS = [
+    "timestamp", "backbone", "trial", "status", "epochs_run",
+    "learning_rate", "num_train_epochs", "warmup_steps", "weight_decay",
+    "accuracy", "precision", "recall", "f1", "wall_time",
+]
+
+# Step 1: Prepare tokenized datasets and the label map
+def prepare_data(backbone, train_texts, train_labels, val_texts, val_labels):
+    all_labels = list(train_labels) + list(val_labels)
+    if any(pd.isnull(label) for label in all_labels):
+        raise ValueError("Found NaN values in the combined labels. Please check the dataset and preprocessing steps.")
+    unique_labels = sorted(list(set(all_labels)))
+
+    # Create a mapping from label to index
+    label_map = {label: idx for idx, label in enumerate(unique_labels)}
+    print(f"Label map: {label_map}")
+
+    tokenizer_class, _, checkpoint, _, _, _ = BACKBONES[backbone]
+    tokenizer = tokenizer_class.from_pretrained(checkpoint)
+
+    # Create datasets (tokenized once and cached on disk)
+    train_dataset = PreTokenizedDataset.from_texts(
+        train_texts, [label_map[label] for label in train_labels], tokenizer, max_len=128
+    )
+    val_dataset = PreTokenizedDataset.from_texts(
+        val_texts, [label_map[label] for label in val_labels], tokenizer, max_len=128
+    )
+    return tokenizer, train_dataset, val_dataset, label_map
+
+def compute_metrics(pred):
+    return classification_metrics(pred.label_ids, pred.predictions.argmax(-1))
+
+# Step 2: Build the trainer for one set of hyperparameters
+def build_trainer(backbone, train_dataset, val_dataset, num_labels, options, hparams, output_dir, logging_dir, save=True, callbacks=None):
+    _, model_class, checkpoint, _, _, _ = BACKBONES[backbone]
+    model = model_class.from_pretrained(checkpoint, num_labels=num_labels)
+
+    training_args = TrainingArguments(
+        output_dir=output_dir,
+        num_train_epochs=hparams["num_train_epochs"],
+        learning_rate=hparams["learning_rate"],
+        per_device_train_batch_size=options.batch_size,
+        per_device_eval_batch_size=8,
+        gradient_accumulation_steps=options.gradient_accumulation_steps,
+        dataloader_num_workers=options.num_workers,
+        warmup_steps=hparams["warmup_steps"],
+        weight_decay=hparams["weight_decay"],
+        logging_dir=logging_dir,
+        logging_steps=10,
+        eval_strategy="epoch",
+        save_strategy="steps" if save else "no",
+        seed=options.seed,
+    )
+
+    return FineTuneTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        data_collator=make_collator(options.dynamic_padding),
+        compute_metrics=compute_metrics,
+        group_by_length=options.group_by_length,
+        callbacks=callbacks,
+    )
+
+# Step 3: Fine-tune a backbone with one configuration and save it as the served model
+def fine_tune(backbone, train_texts, train_labels, val_texts, val_labels, options, hparams):
+    _, _, _, display_name, results_dir, logs_dir = BACKBONES[backbone]
+    tokenizer, train_dataset, val_dataset, label_map = prepare_data(backbone, train_texts, train_labels, val_texts, val_labels)
+    unique_labels = list(label_map)
+
+    start = time.perf_counter()
+    trainer = build_trainer(backbone, train_dataset, val_dataset, len(unique_labels), options, hparams, results_dir, logs_dir)
+    trainer.train()
+    wall_time = time.perf_counter() - start
+
+    # Display training on device
+    print(f"Training on device: {trainer.args.device}")
+
+    # Save the model and tokenizer
+    model = trainer.model
+    model.save_pretrained(f"./model/emotion_{backbone}_model_1")
+    tokenizer.save_pretrained(f"./model/emotion_{backbone}_tokenizer_1")
+
+    # Evaluate the model on the validation set in a single pass. The logits are cached and
+    # the metric and confusion matrix plots are saved as files under ./eval_metrics
+    output_dir = "./eval_metrics"
+    eval_results = run_evaluation(trainer, val_dataset, unique_labels, f"1_{backbone}", output_dir)
+    print(f"Evaluation Results: {eval_results}")
+
+    # Extract metrics from eval_results
+    metrics = {
+        "Accuracy": eval_results["accuracy"],
+        "Precision": eval_results["precision"],
+        "Recall": eval_results["recall"],
+        "F1-Score": eval_results["f1"],
+    }
+
+    # Save metrics to a custom directory
+    metrics_file_path = os.path.join(output_dir, f"evaluation_metrics_1_{backbone}.txt")
+    training_args = trainer.args
+    with open(metrics_file_path, "w") as f:
+        # Save metrics
+        for metric, value in metrics.items():
+            f.write(f"{metric}: {value:.4f}\n")
+        write_per_class(f, eval_results)
+
+        # Save training parameters
+        f.write("\nTraining Parameters:\n")
+        f.write(f"Backbone: {display_name}\n")
+        f.write(f"Learning Rate: {training_args.learning_rate}\n")
+        f.write(f"Number of Epochs: {training_args.num_train_epochs}\n")
+        f.write(f"Train Batch Size: {training_args.per_device_train_batch_size}\n")
+        f.write(f"Eval Batch Size: {training_args.per_device_eval_batch_size}\n")
+        f.write(f"Warmup Steps: {training_args.warmup_steps}\n")
+        f.write(f"Weight Decay: {training_args.weight_decay}\n")
+        f.write(f"Logging Steps: {training_args.logging_steps}\n")
+        f.write(f"Evaluation Strategy: {training_args.eval_strategy}\n")
+
+        # Save batching options and training throughput
+        write_throughput(f, trainer, options)
+
+    print(f"Metrics and training parameters saved to '{metrics_file_path}'")
+
+    append_leaderboard([{
+        "backbone": backbone, "trial": "single", "status": "completed",
+        "epochs_run": hparams["num_train_epochs"], **hparams,
+        **{metric: eval_results[metric] for metric in ("accuracy", "precision", "recall", "f1")},
+        "wall_time": wall_time,
+    }])
+    print(f"{display_name} model fine-tuned and saved!")
+    return model, tokenizer, label_map
+
+# Step 4: Hyperparameter sweeps
+
+# Callback implementing the median stopping rule: after each evaluation a trial
+# stops when its F1 is below the median F1 that other trials reached at the same
+# epoch. Scores are shared between worker processes through a manager dict.
+class MedianStoppingCallback(TrainerCallback):
+    def __init__(self, shared_scores, lock, min_trials=3, metric="eval_f1"):
+        self.shared_scores = shared_scores
+        self.lock = lock
+        self.min_trials = min_trials
+        self.metric = metric
+        self.stopped_epoch = None
+
+    def on_evaluate(self, args, state, control, metrics=None, **kwargs):
+        score = (metrics or {}).get(self.metric)
+        if score is None:
+            return
+        epoch = int(round(state.epoch))
+        with self.lock:
+            others = list(self.shared_scores.get(epoch, []))
+            self.shared_scores[epoch] = others + [score]
+        if len(others) >= self.min_trials and score < statistics.median(others):
+            print(f"Stopping trial at epoch {epoch}: {self.metric} {score:.4f} < median {statistics.median(others):.4f}")
+            self.stopped_epoch = epoch
+            control.should_training_stop = True
+
+# Function to parse a comma-separated list of numbers
+def parse_values(value, cast=float):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+# Function to build the list of trial configurations for a grid or random sweep
+def sweep_configurations(args):
+    learning_rates = parse_values(args.learning_rates)
+    epochs = parse_values(args.epochs_values, int)
+    warmups = parse_values(args.warmup_values, int)
+    weight_decays = parse_values(args.weight_decay_values)
+    if args.sweep == "grid":
+        return [
+            {"learning_rate": lr, "num_train_epochs": n, "warmup_steps": w, "weight_decay": wd}
+            for lr, n, w, wd in itertools.product(learning_rates, epochs, warmups, weight_decays)
+        ]
+
+    # Random sweep: log-uniform learning rate and uniform warmup/weight decay within the given ranges
+    rng = random.Random(args.seed)
+    return [
+        {
+            "learning_rate": 10 ** rng.uniform(math.log10(min(learning_rates)), math.log10(max(learning_rates))),
+            "num_train_epochs": rng.choice(epochs),
+            "warmup_steps": rng.randint(min(warmups), max(warmups)),
+            "weight_decay": rng.uniform(min(weight_decays), max(weight_decays)),
+        }
+        for _ in range(args.trials)
+    ]
+
+# Function to pin a sweep worker process to its own set of cores and thread budget
+def _init_worker(core_sets, threads):
+    cores = core_sets.get()
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+# Function to run one sweep trial in a worker process
+def _run_trial(trial_id, backbone, hparams, options, splits, shared_scores, lock):
+    train_texts, val_texts, train_labels, val_labels = splits
+    _, train_dataset, val_dataset, label_map = prepare_data(backbone, train_texts, train_labels, val_texts, val_labels)
+    stopping = MedianStoppingCallback(shared_scores, lock, min_trials=options.min_trials_for_stopping)
+    trial_dir = os.path.join("./sweeps", backbone, f"trial_{trial_id:03d}")
+
+    start = time.perf_counter()
+    trainer = build_trainer(
+        backbone, train_dataset, val_dataset, len(label_map), options, hparams,
+        trial_dir, os.path.join(trial_dir, "logs"), save=False, callbacks=[stopping],
+    )
+    trainer.train()
+    evaluations = [entry for entry in trainer.state.log_history if "eval_f1" in entry]
+    final = evaluations[-1] if evaluations else {}
+    return {
+        "backbone": backbone,
+        "trial": trial_id,
+        "status": "stopped" if stopping.stopped_epoch is not None else "completed",
+        "epochs_run": stopping.stopped_epoch or hparams["num_train_epochs"],
+        **hparams,
+        **{metric: final.get(f"eval_{metric}") for metric in ("accuracy", "precision", "recall", "f1")},
+        "wall_time": time.perf_counter() - start,
+    }
+
+def _run_trial_args(args):
+    return _run_trial(*args)
+
+# Function to run a sweep with parallel worker processes
+def run_sweep(args, options, splits):
+    configurations = sweep_configurations(args)
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(args.workers, len(configurations)))
+    threads = args.threads_per_worker or max(1, cpu_count // workers)
+    print(f"Running {len(configurations)} trials on {workers} workers with {threads} threads each")
+
+    # Tokenize once in the parent so the workers only memory-map the cache
+    prepare_data(args.backbone, splits[0], splits[2], splits[1], splits[3])
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        core_sets = manager.Queue()
+        for worker in range(workers):
+            cores = set(range(worker * threads, (worker + 1) * threads)) & set(range(cpu_count))
+            core_sets.put(cores)
+        shared_scores = manager.dict()
+        lock = manager.Lock()
+
+        tasks = [
+            (trial_id, args.backbone, hparams, options, splits, shared_scores, lock)
+            for trial_id, hparams in enumerate(configurations)
+        ]
+        with context.Pool(workers, initializer=_init_worker, initargs=(core_sets, threads)) as pool:
+            for result in pool.imap_unordered(_run_trial_args, tasks):
+                print(f"Trial {result['trial']} {result['status']}: f1={result['f1']}")
+                append_leaderboard([result])
+
+    print(f"Leaderboard saved to '{LEADERBOARD_PATH}'")
+
+# Function to add results to the leaderboard file, keeping it sorted by F1
+def append_leaderboard(rows, path=LEADERBOARD_PATH):
+    existing = []
+    if os.path.exists(path):
+        with open(path, newline="") as f:
+            existing = list(csv.DictReader(f))
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for row in rows:
+        existing.append({"timestamp": timestamp, **row})
+    existing.sort(key=lambda row: float(row["f1"]) if row.get("f1") not in (None, "") else -1.0, reverse=True)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LEADERBOARD_FIELDS)
+        writer.writeheader()
+        writer.writerows(existing)
+
+# Step 5: Main function
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fine-tune a backbone on the Quran emotions dataset")
+    parser.add_argument("--backbone", choices=sorted(BACKBONES), required=True)
+    parser.add_argument("--learning-rate", type=float, default=DEFAULT_HPARAMS["learning_rate"])
+    parser.add_argument("--epochs", type=int, default=DEFAULT_HPARAMS["num_train_epochs"])
+    parser.add_argument("--warmup-steps", type=int, default=DEFAULT_HPARAMS["warmup_steps"])
+    parser.add_argument("--weight-decay", type=float, default=DEFAULT_HPARAMS["weight_decay"])
+    parser.add_argument("--seed", type=int, default=42)
+    add_training_options(parser)
+
+    sweep = parser.add_argument_group("sweep")
+    sweep.add_argument("--sweep", choices=["grid", "random"], help="run a hyperparameter sweep instead of a single run")
+    sweep.add_argument("--learning-rates", default="2e-5,3e-5,5e-5")
+    sweep.add_argument("--epochs-values", default="2,3,4")
+    sweep.add_argument("--warmup-values", default="0,500")
+    sweep.add_argument("--weight-decay-values", default="0.0,0.01")
+    sweep.add_argument("--trials", type=int, default=8, help="number of trials of a random sweep")
+    sweep.add_argument("--workers", type=int, default=2, help="parallel trial processes")
+    sweep.add_argument("--threads-per-worker", type=int, default=0, help="CPU threads per trial (default: cores / workers)")
+    sweep.add_argument("--min-trials-for-stopping", type=int, default=3,
+                       help="trials that must report an epoch before a trial can be stopped early")
+    args = parser.parse_args(argv)
+
+    train_texts, val_texts, train_labels, val_labels = load_split()
+    if args.sweep:
+        run_sweep(args, args, (train_texts, val_texts, train_labels, val_labels))
+        return
+
+    hparams = {
+        "learning_rate": args.learning_rate,
+        "num_train_epochs": args.epochs,
+        "warmup_steps": args.warmup_steps,
+        "weight_decay": args.weight_decay,
+    }
+    fine_tune(args.backbone, train_texts, train_labels, val_texts, val_labels, args, hparams)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
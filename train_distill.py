@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments
+
+from evaluate import classification_metrics, load_split
+from training_data import PreTokenizedDataset, make_collator
+from training_utils import FineTuneTrainer, add_training_options, write_throughput
+
+# Distill the BERT + RoBERTa ensemble served by app.py into a single student model.
+# The ensemble's averaged probabilities are the soft targets, mixed with the hard
+# labels. Teacher probabilities are computed once and cached under ./cache/.
+
+# Step 1: Compute (or load cached) teacher probabilities
+def teacher_cache_path(texts, cache_dir="./cache"):
+    digest = hashlib.sha256()
+    for model_dir in ("./model/emotion_bert_model_1", "./model/emotion_roberta_model_1"):
+        for name in sorted(os.listdir(model_dir)):
+            digest.update(f"{model_dir}/{name}:{os.path.getmtime(os.path.join(model_dir, name))}".encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8") + b"\0")
+    return os.path.join(cache_dir, f"teacher_probs_{digest.hexdigest()[:16]}.npy")
+
+def load_teacher_probabilities(texts, batch_size=32):
+    cache_path = teacher_cache_path(texts)
+    if os.path.exists(cache_path):
+        print(f"Loading cached teacher probabilities from '{cache_path}'")
+        return np.load(cache_path)
+
+    import app
+    probabilities = []
+    for i in range(0, len(texts), batch_size):
+        _, combined_probabilities = app.classify_emotion_ensemble_batch(list(texts[i:i + batch_size]))
+        probabilities.append(combined_probabilities)
+    probabilities = np.concatenate(probabilities).astype(np.float32)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    np.save(cache_path, probabilities)
+    print(f"Teacher probabilities saved to '{cache_path}'")
+    return probabilities
+
+# Step 2: Trainer with the distillation loss
+class DistillationTrainer(FineTuneTrainer):
+    def __init__(self, *args, alpha=0.5, temperature=2.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.alpha = alpha
+        self.temperature = temperature
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        teacher_probs = inputs.pop("teacher_probs")
+        labels = inputs["labels"]
+        outputs = model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+        logits = outputs.logits
+
+        # Soften both distributions with the temperature. The teacher is an average of
+        # probabilities, so its log-probabilities stand in for logits.
+        teacher_log_probs = torch.log(teacher_probs.clamp_min(1e-8))
+        soft_targets = F.softmax(teacher_log_probs / self.temperature, dim=-1)
+        soft_loss = F.kl_div(
+            F.log_softmax(logits / self.temperature, dim=-1), soft_targets, reduction="batchmean"
+        ) * self.temperature ** 2
+        hard_loss = F.cross_entropy(logits, labels)
+        loss = self.alpha * soft_loss + (1 - self.alpha) * hard_loss
+        return (loss, outputs) if return_outputs else loss
+
+# Step 3: Train the student
+def distill_student(args, train_texts, train_labels, val_texts, val_labels):
+    unique_labels = sorted(set(train_labels) | set(val_labels))
+    label_map = {label: idx for idx, label in enumerate(unique_labels)}
+    print(f"Label map: {label_map}")
+    train_label_ids = [label_map[label] for label in train_labels]
+    val_label_ids = [label_map[label] for label in val_labels]
+
+    train_teacher_probs = load_teacher_probabilities(train_texts)
+    val_teacher_probs = load_teacher_probabilities(val_texts)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.student)
+    model = AutoModelForSequenceClassification.from_pretrained(args.student, num_labels=len(unique_labels))
+
+    train_dataset = PreTokenizedDataset.from_texts(
+        train_texts, train_label_ids, tokenizer, max_len=128, extras={"teacher_probs": train_teacher_probs}
+    )
+    val_dataset = PreTokenizedDataset.from_texts(
+        val_texts, val_label_ids, tokenizer, max_len=128, extras={"teacher_probs": val_teacher_probs}
+    )
+
+    def compute_metrics(pred):
+        return classification_metrics(pred.label_ids, pred.predictions.argmax(-1))
+
+    training_args = TrainingArguments(
+        output_dir="./results_student",
+        num_train_epochs=args.epochs,
+        per_device_train_batch_size=args.batch_size,
+        per_device_eval_batch_size=8,
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+        dataloader_num_workers=args.num_workers,
+        learning_rate=args.learning_rate,
+        warmup_steps=500,
+        weight_decay=0.01,
+        logging_dir="./logs_student",
+        logging_steps=10,
+        eval_strategy="epoch",
+        remove_unused_columns=False,
+    )
+
+    trainer = DistillationTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        data_collator=make_collator(args.dynamic_padding),
+        compute_metrics=compute_metrics,
+        group_by_length=args.group_by_length,
+        alpha=args.alpha,
+        temperature=args.temperature,
+    )
+    trainer.train()
+
+    # Save the student in the same layout as the other fine-tuned models
+    model.save_pretrained(args.model_dir)
+    tokenizer.save_pretrained(args.tokenizer_dir)
+    print(f"Student saved to '{args.model_dir}' and '{args.tokenizer_dir}'")
+    return trainer, tokenizer
+
+# Step 4: Compare the student with the ensemble
+def write_report(args, trainer, tokenizer, val_texts, val_labels):
+    import app
+    from benchmarks.common import SAMPLE_TEXTS, summarize_latencies, time_calls
+
+    model = trainer.model
+    model.eval()
+    val_texts = list(val_texts)
+    student_probs = np.concatenate([
+        app.classify_emotion_batch(model, tokenizer, val_texts[i:i + 32]) for i in range(0, len(val_texts), 32)
+    ])
+    student_preds = app.label_names[student_probs.argmax(axis=1)]
+    ensemble_preds = app.label_names[load_teacher_probabilities(val_texts).argmax(axis=1)]
+
+    results = {
+        "Student": (
+            classification_metrics(list(val_labels), list(student_preds)),
+            summarize_latencies(time_calls(lambda: app.classify_emotion_batch(model, tokenizer, SAMPLE_TEXTS[:1]))),
+        ),
+        "Ensemble": (
+            classification_metrics(list(val_labels), list(ensemble_preds)),
+            summarize_latencies(time_calls(lambda: app.classify_emotion_ensemble_batch(SAMPLE_TEXTS[:1]))),
+        ),
+    }
+
+    output_dir = "./eval_metrics"
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(output_dir, "evaluation_metrics_1_student.txt")
+    with open(report_path, "w") as f:
+        for name, (metrics, latency) in results.items():
+            f.write(f"{name}:\n")
+            for metric, value in metrics.items():
+                f.write(f"  {metric}: {value:.4f}\n")
+            f.write(f"  p50 latency (batch 1): {latency['p50_ms']:.2f} ms\n")
+            f.write(f"  p95 latency (batch 1): {latency['p95_ms']:.2f} ms\n")
+        f.write("\nDistillation Parameters:\n")
+        f.write(f"Student: {args.student}\n")
+        f.write(f"Alpha: {args.alpha}\n")
+        f.write(f"Temperature: {args.temperature}\n")
+        f.write(f"Number of Epochs: {args.epochs}\n")
+        f.write(f"Learning Rate: {args.learning_rate}\n")
+        f.write(f"Train Batch Size: {args.batch_size}\n")
+        write_throughput(f, trainer, args)
+    print(open(report_path).read())
+    print(f"Report saved to '{report_path}'")
+
+# Step 5: Main function
+def main():
+    parser = argparse.ArgumentParser(description="Distill the BERT + RoBERTa ensemble into a single student")
+    parser.add_argument("--student", default="distilbert-base-uncased")
+    parser.add_argument("--alpha", type=float, default=0.5, help="weight of the soft-target loss")
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--learning-rate", type=float, default=5e-5)
+    parser.add_argument("--model-dir", default="./model/emotion_student_model_1")
+    parser.add_argument("--tokenizer-dir", default="./model/emotion_student_tokenizer_1")
+    add_training_options(parser)
+    args = parser.parse_args()
+
+    train_texts, val_texts, train_labels, val_labels = load_split()
+    start = time.perf_counter()
+    trainer, tokenizer = distill_student(args, train_texts, train_labels, val_texts, val_labels)
+    print(f"Student distilled in {time.perf_counter() - start:.0f}s")
+    write_report(args, trainer, tokenizer, val_texts, val_labels)
+
+if __name__ == "__main__":
+    main()
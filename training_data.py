@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import re
+from functools import partial
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+# Pre-tokenized training data. Each split is tokenized in one batched call per
+# tokenizer and stored as compact .npy arrays under ./cache/tokenized/, keyed by
+# the tokenizer name, max_len and a hash of the texts and labels. Later runs
+# memory-map the arrays and skip tokenization entirely.
+
+CACHE_DIR = "./cache/tokenized"
+CACHE_VERSION = 1
+
+
+# Function to hash the texts and labels of a split
+def dataset_hash(texts, labels):
+    digest = hashlib.sha256()
+    for text, label in zip(texts, labels):
+        digest.update(f"{text}\0{label}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Function to get the cache directory of a split for one tokenizer and max_len
+def cache_path(tokenizer, max_len, texts, labels, cache_dir=CACHE_DIR):
+    tokenizer_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", tokenizer.name_or_path).strip("_")
+    return os.path.join(cache_dir, f"{tokenizer_name}_{max_len}_{dataset_hash(texts, labels)}")
+
+
+# Function to tokenize a split in one batched call and write it to the cache
+def build_cache(texts, labels, tokenizer, max_len, path):
+    encoding = tokenizer(
+        list(texts),
+        add_special_tokens=True,
+        max_length=max_len,
+        return_token_type_ids=False,
+        padding="max_length",
+        truncation=True,
+        return_attention_mask=True,
+    )
+    id_dtype = np.int16 if len(tokenizer) <= np.iinfo(np.int16).max else np.int32
+    arrays = {
+        "input_ids": np.asarray(encoding["input_ids"], dtype=id_dtype),
+        "attention_mask": np.asarray(encoding["attention_mask"], dtype=np.int8),
+        "labels": np.asarray(labels, dtype=np.int16),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    # The metadata file is written last and marks the cache as complete
+    meta = {
+        "version": CACHE_VERSION,
+        "tokenizer": tokenizer.name_or_path,
+        "max_len": max_len,
+        "size": len(arrays["labels"]),
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+# Function to load a cached split as read-only memory-mapped arrays, or None if it is missing
+def load_cache(path):
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in ("input_ids", "attention_mask", "labels")
+    }
+
+
+# Dataset over pre-tokenized arrays. Items are zero-copy views into the
+# memory-mapped arrays; collate_pretokenized turns a list of them into tensors.
+# `extras` holds additional per-example float arrays, e.g. teacher probabilities.
+class PreTokenizedDataset(Dataset):
+    def __init__(self, arrays, extras=None):
+        self.arrays = arrays
+        self.extras = extras or {}
+
+    @classmethod
+    def from_texts(cls, texts, labels, tokenizer, max_len, extras=None, cache_dir=CACHE_DIR):
+        texts = texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+        labels = labels.tolist() if hasattr(labels, 'tolist') else list(labels)
+        path = cache_path(tokenizer, max_len, texts, labels, cache_dir)
+        arrays = load_cache(path)
+        if arrays is None:
+            print(f"Tokenizing {len(texts)} examples into '{path}'")
+            build_cache(texts, labels, tokenizer, max_len, path)
+            arrays = load_cache(path)
+        else:
+            print(f"Using pre-tokenized cache '{path}'")
+        return cls(arrays, extras)
+
+    def __len__(self):
+        return len(self.arrays["labels"])
+
+    # Number of non-padding tokens of every example, used for length-grouped sampling
+    @property
+    def lengths(self):
+        if not hasattr(self, "_lengths"):
+            self._lengths = np.asarray(self.arrays["attention_mask"]).sum(axis=1, dtype=np.int64)
+        return self._lengths
+
+    def __getitem__(self, idx):
+        item = {name: array[idx] for name, array in self.arrays.items()}
+        for name, array in self.extras.items():
+            item[name] = array[idx]
+        return item
+
+
+# Collator for PreTokenizedDataset items: stacks the views and widens the
+# compact integer arrays to the dtypes the models expect. With dynamic padding
+# the batch is trimmed to its longest example (the cached arrays are padded on
+# the right to max_len).
+def collate_pretokenized(features, dynamic_padding=True):
+    batch = {}
+    for name in features[0]:
+        stacked = np.stack([feature[name] for feature in features])
+        if np.issubdtype(stacked.dtype, np.integer):
+            batch[name] = torch.from_numpy(stacked.astype(np.int64))
+        else:
+            batch[name] = torch.from_numpy(stacked.astype(np.float32))
+    if dynamic_padding:
+        longest = int(batch["attention_mask"].sum(dim=1).max())
+        batch["input_ids"] = batch["input_ids"][:, :longest]
+        batch["attention_mask"] = batch["attention_mask"][:, :longest]
+    return batch
+
+
+# Function to get the collator for the chosen padding mode
+def make_collator(dynamic_padding=True):
+    return partial(collate_pretokenized, dynamic_padding=dynamic_padding)
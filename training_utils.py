@@ -0,0 +1,92 @@
+import time
+
+from transformers import Trainer, TrainerCallback
+from transformers.trainer_pt_utils import LengthGroupedSampler
+
+
+# Function to add the batching and data-loading options shared by the training scripts
+def add_training_options(parser):
+    parser.add_argument("--batch-size", type=int, default=8, help="per-device train batch size")
+    parser.add_argument("--gradient-accumulation-steps", type=int, default=1,
+                        help="effective batch size is batch size x accumulation steps")
+    parser.add_argument("--num-workers", type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument("--no-group-by-length", dest="group_by_length", action="store_false",
+                        help="use the default random sampler instead of grouping examples of similar length")
+    parser.add_argument("--no-dynamic-padding", dest="dynamic_padding", action="store_false",
+                        help="pad every batch to max_len instead of its longest example")
+    return parser
+
+
+# Callback that measures training throughput per epoch: samples/sec, tokens/sec
+# (non-padding tokens), the share of padding in the batches and wall time
+class ThroughputTelemetry(TrainerCallback):
+    def __init__(self):
+        self.epochs = []
+        self._reset()
+
+    def _reset(self):
+        self.samples = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.start = time.perf_counter()
+
+    # Count one training batch
+    def observe(self, inputs):
+        attention_mask = inputs["attention_mask"]
+        self.samples += attention_mask.shape[0]
+        self.tokens += int(attention_mask.sum())
+        self.padded_tokens += attention_mask.numel()
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._reset()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        wall_time = time.perf_counter() - self.start
+        self.epochs.append({
+            "epoch": len(self.epochs) + 1,
+            "wall_time": wall_time,
+            "samples_per_second": self.samples / wall_time if wall_time else 0.0,
+            "tokens_per_second": self.tokens / wall_time if wall_time else 0.0,
+            "padding_ratio": 1.0 - self.tokens / self.padded_tokens if self.padded_tokens else 0.0,
+        })
+        print(f"Epoch {len(self.epochs)} throughput: {self.epochs[-1]}")
+
+
+# Trainer used by the training scripts. It samples training batches from groups
+# of similar length (using the dataset's `lengths`) and records throughput.
+class FineTuneTrainer(Trainer):
+    def __init__(self, *args, group_by_length=True, **kwargs):
+        self.telemetry = ThroughputTelemetry()
+        callbacks = list(kwargs.pop("callbacks", None) or []) + [self.telemetry]
+        super().__init__(*args, callbacks=callbacks, **kwargs)
+        self.group_by_length_enabled = group_by_length
+
+    def _get_train_sampler(self, *args, **kwargs):
+        if self.group_by_length_enabled and hasattr(self.train_dataset, "lengths"):
+            return LengthGroupedSampler(
+                self.args.train_batch_size * self.args.gradient_accumulation_steps,
+                lengths=self.train_dataset.lengths.tolist(),
+            )
+        return super()._get_train_sampler(*args, **kwargs)
+
+    def training_step(self, model, inputs, *args, **kwargs):
+        self.telemetry.observe(inputs)
+        return super().training_step(model, inputs, *args, **kwargs)
+
+
+# Function to write the batching options and per-epoch throughput to a metrics file
+def write_throughput(f, trainer, options):
+    f.write(f"Gradient Accumulation Steps: {trainer.args.gradient_accumulation_steps}\n")
+    f.write(f"Effective Batch Size: {trainer.args.train_batch_size * trainer.args.gradient_accumulation_steps}\n")
+    f.write(f"DataLoader Workers: {trainer.args.dataloader_num_workers}\n")
+    f.write(f"Group By Length: {options.group_by_length}\n")
+    f.write(f"Dynamic Padding: {options.dynamic_padding}\n")
+
+    f.write("\nThroughput:\n")
+    for epoch in trainer.telemetry.epochs:
+        f.write(
+            f"Epoch {epoch['epoch']}: {epoch['samples_per_second']:.2f} samples/sec, "
+            f"{epoch['tokens_per_second']:.1f} tokens/sec, "
+            f"padding ratio {epoch['padding_ratio']:.3f}, "
+            f"wall time {epoch['wall_time']:.1f}s\n"
+        )
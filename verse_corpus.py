@@ -0,0 +1,44 @@
+from verse_store import STORE_DIR, load_dataframe
+
+# The full verse corpus: every verse of csv1.csv (6,236 verses with Arabic text
+# and English translation) merged with the emotion-labeled set. A verse keeps
+# the text and surah names of the labeled set when it is labeled, and its
+# `labels` are the emotions it is labeled with (empty for unlabeled verses; a
+# few verses carry more than one). Rows are ordered by surah and verse number.
+# Both datasets are read from the verse store (verse_store.py) when it is built.
+
+CORPUS_PATH = "./dataset/csv1.csv"
+LABELED_PATH = "./dataset/quran_emotions_cleaned_2.csv"
+KEY_COLUMNS = ["surah_no", "ayah_no_surah"]
+COLUMNS = KEY_COLUMNS + ["surah_name_ar", "ayah_ar", "ayah_en", "surah_name_en", "surah_name_roman", "labels"]
+
+
+# Function to load the merged verse corpus as a DataFrame with the columns in COLUMNS
+def load_verse_corpus(corpus_path=CORPUS_PATH, labeled_path=LABELED_PATH, store_dir=STORE_DIR):
+    corpus = load_dataframe(corpus_path, KEY_COLUMNS + ["surah_name_ar", "ayah_ar", "ayah_en"], store_dir, categorical=False)
+    labeled = load_dataframe(
+        labeled_path,
+        KEY_COLUMNS + ["label", "ayah_ar", "ayah_en", "surah_name_en", "surah_name_roman"],
+        store_dir,
+        categorical=False,
+    )
+
+    # Emotions per verse, and the labeled set's text and names for the verses it covers
+    labels = labeled.groupby(KEY_COLUMNS)["label"].agg(lambda values: tuple(sorted(set(values))))
+    labeled_text = labeled.drop_duplicates(KEY_COLUMNS).set_index(KEY_COLUMNS)[["ayah_ar", "ayah_en"]]
+    surah_names = labeled.drop_duplicates("surah_no").set_index("surah_no")[["surah_name_en", "surah_name_roman"]]
+
+    corpus = corpus.set_index(KEY_COLUMNS)
+    corpus.update(labeled_text)
+    corpus["labels"] = labels.reindex(corpus.index)
+    corpus["labels"] = corpus["labels"].apply(lambda value: value if isinstance(value, tuple) else ())
+    corpus = corpus.reset_index()
+
+    # Surahs without labeled verses fall back to their Arabic name
+    corpus = corpus.join(surah_names, on="surah_no")
+    corpus["surah_name_en"] = corpus["surah_name_en"].fillna(corpus["surah_name_ar"])
+    corpus["surah_name_roman"] = corpus["surah_name_roman"].fillna(corpus["surah_name_ar"])
+    corpus["ayah_en"] = corpus["ayah_en"].fillna("")
+    corpus["ayah_ar"] = corpus["ayah_ar"].fillna("")
+
+    return corpus.sort_values(KEY_COLUMNS).reset_index(drop=True)[COLUMNS]
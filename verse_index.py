@@ -0,0 +1,48 @@
+import random
+
+NO_VERSE_FOUND = "No verse found for the predicted emotion."
+# Dataset columns the index is built from: the label, then the details format_verse takes
+COLUMNS = ["label", "ayah_ar", "ayah_en", "surah_name_roman", "surah_name_en", "ayah_no_surah"]
+
+
+# Function to format a verse with its details the way /predict returns it
+def format_verse(ayah_ar, ayah_en, surah_name_roman, surah_name_en, ayah_no_surah):
+    return f"{ayah_ar}\n{ayah_en} (Surah {surah_name_roman}: {surah_name_en}, Verse {ayah_no_surah})"
+
+
+# Per-emotion verse index built once at startup. Each label maps to a tuple of
+# preformatted verse strings, so picking a verse is a single random integer
+# draw with no pandas on the request path.
+class VerseIndex:
+    def __init__(self, verses_by_label):
+        self.verses_by_label = {label: tuple(verses) for label, verses in verses_by_label.items()}
+
+    # Build the index from the label column and the detail columns, in COLUMNS order
+    @classmethod
+    def from_columns(cls, labels, *details):
+        verses_by_label = {}
+        for label, *row in zip(labels, *details):
+            verses_by_label.setdefault(label, []).append(format_verse(*row))
+        return cls(verses_by_label)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls.from_columns(*(df[name].tolist() for name in COLUMNS))
+
+    # Build the index from a VerseStore (see verse_store.py) opened with at least COLUMNS
+    @classmethod
+    def from_store(cls, store):
+        return cls.from_columns(*(store.column(name) for name in COLUMNS))
+
+    # Return a random preformatted verse for the label, or None if it has no verses
+    def sample(self, label, rng=random):
+        verses = self.verses_by_label.get(label)
+        if not verses:
+            return None
+        return verses[rng.randrange(len(verses))]
+
+    def labels(self):
+        return list(self.verses_by_label)
+
+    def __len__(self):
+        return sum(len(verses) for verses in self.verses_by_label.values())
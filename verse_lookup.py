@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+import numpy as np
+
+# Direct verse lookup for GET /verse/<surah>/<ayah>. A dense (surah, verse) ->
+# row array over the verse corpus (see verse_corpus.py) finds a verse with two
+# bounds checks and one array read. Every verse's JSON body is serialized once
+# at startup, together with a strong ETag derived from the body bytes, so a
+# request only picks the prepared bytes, or answers 304 Not Modified when the
+# client already holds them. The ETags depend only on the content, so every
+# worker process and every restart serves the same ones.
+
+CONTENT_TYPE = "application/json"
+
+
+# Function to check an If-None-Match header against an ETag (weak comparison, as RFC 9110 specifies)
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class VerseLookup:
+    def __init__(self, rows, bodies, etags, max_age=0):
+        self.rows = rows
+        self.bodies = bodies
+        self.etags = etags
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+    # Build the row array and the serialized bodies. `verses` are the preformatted verse
+    # strings of the corpus rows, as /predict returns them.
+    @classmethod
+    def from_corpus(cls, corpus, verses, max_age=0):
+        surahs = corpus["surah_no"].to_numpy(dtype=np.int64)
+        ayahs = corpus["ayah_no_surah"].to_numpy(dtype=np.int64)
+        rows = np.full((surahs.max() + 1, ayahs.max() + 1), -1, dtype=np.int32)
+        rows[surahs, ayahs] = np.arange(len(corpus), dtype=np.int32)
+
+        bodies = []
+        etags = []
+        columns = ["surah_no", "ayah_no_surah", "surah_name_ar", "surah_name_en", "surah_name_roman", "ayah_ar", "ayah_en", "labels"]
+        for (surah_no, ayah_no, name_ar, name_en, name_roman, ayah_ar, ayah_en, labels), verse in zip(
+            corpus[columns].itertuples(index=False, name=None), verses
+        ):
+            body = json.dumps({
+                "surah_no": int(surah_no),
+                "ayah_no_surah": int(ayah_no),
+                "surah_name_ar": name_ar,
+                "surah_name_en": name_en,
+                "surah_name_roman": name_roman,
+                "ayah_ar": ayah_ar,
+                "ayah_en": ayah_en,
+                "emotions": list(labels),
+                "verse": verse,
+            }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            bodies.append(body)
+            etags.append(f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        return cls(rows, tuple(bodies), tuple(etags), max_age)
+
+    # Return the corpus row of a verse, or -1 when there is no such verse
+    def row(self, surah_no, ayah_no):
+        if 0 < surah_no < self.rows.shape[0] and 0 < ayah_no < self.rows.shape[1]:
+            return int(self.rows[surah_no, ayah_no])
+        return -1
+
+    # Return (status, body, headers) of a lookup: 200 with the verse, 304 when
+    # `if_none_match` matches its ETag, or 404 with a None body
+    def response(self, surah_no, ayah_no, if_none_match=None):
+        row = self.row(surah_no, ayah_no)
+        if row < 0:
+            return 404, None, {}
+        headers = {"ETag": self.etags[row], "Cache-Control": self.cache_control}
+        if etag_matches(if_none_match, self.etags[row]):
+            return 304, b"", headers
+        return 200, self.bodies[row], headers
+
+    def __len__(self):
+        return len(self.bodies)
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# Columnar verse store. `python verse_store.py` converts each verse CSV into a
+# directory with one .npy file per column and a manifest:
+#   - integer columns (surah_no, ayah_no_surah, ...) in the smallest integer type
+#     that holds them (int16 for surah and verse numbers)
+#   - the emotion label and the surah names as categorical codes, with the
+#     categories in the manifest
+#   - text columns as one UTF-8 byte array plus int64 row offsets
+# Columns that are empty in every row (csv1.csv has one) are dropped. Opening a
+# store memory-maps only the requested columns, so a process never parses the
+# CSV and the pages of the column files are shared by every process that maps
+# them. A store records the size and modification time of its CSV and is
+# ignored once the CSV changes; rebuild it after editing a dataset.
+
+STORE_DIR = "./cache/verse_store"
+DATASETS = [
+    "./dataset/quran_emotions.csv",
+    "./dataset/quran_emotions_cleaned_2.csv",
+    "./dataset/csv1.csv",
+]
+CATEGORICAL_COLUMNS = {"label", "surah_name_ar", "surah_name_en", "surah_name_roman"}
+STORE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+# Function to return the store directory of a CSV file
+def store_path(csv_path, store_dir=STORE_DIR):
+    return os.path.join(store_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+# Function to describe the CSV a store is built from
+def source_info(csv_path):
+    return {
+        "path": os.path.abspath(csv_path),
+        "size": os.path.getsize(csv_path),
+        "mtime": os.path.getmtime(csv_path),
+    }
+
+
+# Function to pick the smallest signed integer type that holds the values
+def _smallest_int(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+# Function to encode one column; returns its manifest entry and its arrays by file suffix
+def _encode_column(name, values):
+    import pandas as pd
+
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_integer_dtype(values):
+        dtype = _smallest_int(values.min(), values.max())
+        return {"kind": "int", "dtype": dtype.name}, {"": values.to_numpy(dtype=dtype)}
+    if pd.api.types.is_float_dtype(values):
+        return {"kind": "numeric", "dtype": values.dtype.name}, {"": values.to_numpy()}
+
+    strings = [None if is_missing else value for value, is_missing in zip(values.tolist(), missing.tolist())]
+    if name in CATEGORICAL_COLUMNS:
+        categories = sorted({value for value in strings if value is not None})
+        code_of = {category: code for code, category in enumerate(categories)}
+        dtype = _smallest_int(-1, len(categories))
+        codes = np.array([code_of[value] if value is not None else -1 for value in strings], dtype=dtype)
+        return {"kind": "category", "dtype": dtype.name, "categories": categories}, {"": codes}
+
+    encoded = [str(value).encode("utf-8") if value is not None else b"" for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    arrays = {".data": np.frombuffer(b"".join(encoded), dtype=np.uint8), ".offsets": offsets}
+    if missing.any():
+        arrays[".missing"] = missing
+    return {"kind": "string", "missing": bool(missing.any())}, arrays
+
+
+# Function to convert a verse CSV into a store directory (manifest last)
+def build_store(csv_path, path=None):
+    import pandas as pd
+
+    path = path or store_path(csv_path)
+    df = pd.read_csv(csv_path)
+    df = df.loc[:, df.notna().any()]
+
+    os.makedirs(path, exist_ok=True)
+    columns = {}
+    for name in df.columns:
+        columns[name], arrays = _encode_column(name, df[name])
+        for suffix, array in arrays.items():
+            np.save(os.path.join(path, f"{name}{suffix}.npy"), array)
+    manifest = {"version": STORE_VERSION, "rows": len(df), "source": source_info(csv_path), "columns": columns}
+    with open(os.path.join(path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# A text column: row offsets into one UTF-8 byte array, decoded row by row
+class StringColumn:
+    def __init__(self, data, offsets, missing=None):
+        self.data = data
+        self.offsets = offsets
+        self.missing = missing
+
+    def __getitem__(self, row):
+        if self.missing is not None and self.missing[row]:
+            return None
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    # Decode every row; missing rows are None
+    def tolist(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        values = [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+        if self.missing is not None:
+            values = [None if missing else value for value, missing in zip(values, self.missing.tolist())]
+        return values
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+# Memory-mapped columns of one verse dataset
+class VerseStore:
+    def __init__(self, path, manifest, arrays):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+
+    # Memory-map the columns (all of them when `columns` is None). Raises FileNotFoundError
+    # when the store has not been built and KeyError for a column it does not have.
+    @classmethod
+    def open(cls, path, columns=None):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"Verse store in '{path}' has version {manifest.get('version')}, expected {STORE_VERSION}")
+        columns = list(manifest["columns"]) if columns is None else list(columns)
+        arrays = {}
+        for name in columns:
+            spec = manifest["columns"][name]
+            if spec["kind"] == "string":
+                suffixes = [".data", ".offsets"] + ([".missing"] if spec["missing"] else [])
+            else:
+                suffixes = [""]
+            for suffix in suffixes:
+                arrays[f"{name}{suffix}"] = np.load(os.path.join(path, f"{name}{suffix}.npy"), mmap_mode="r")
+        return cls(path, manifest, arrays)
+
+    @property
+    def columns(self):
+        return [name for name in self.manifest["columns"] if name in self.arrays or f"{name}.data" in self.arrays]
+
+    # Return (codes, categories) of a categorical column; code -1 is a missing value
+    def codes(self, name):
+        return self.arrays[name], self.manifest["columns"][name]["categories"]
+
+    # Return a column: a NumPy array for numbers, a StringColumn for text and the
+    # decoded values (None when missing) for categorical columns
+    def column(self, name):
+        spec = self.manifest["columns"][name]
+        if spec["kind"] == "string":
+            return StringColumn(self.arrays[f"{name}.data"], self.arrays[f"{name}.offsets"], self.arrays.get(f"{name}.missing"))
+        if spec["kind"] == "category":
+            codes, categories = self.codes(name)
+            return [categories[code] if code >= 0 else None for code in codes.tolist()]
+        return self.arrays[name]
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    # Build a DataFrame of the columns; categorical columns become
+    # pandas categoricals unless `categorical` is False
+    def to_dataframe(self, columns=None, categorical=True):
+        import pandas as pd
+
+        data = {}
+        for name in columns or self.columns:
+            spec = self.manifest["columns"][name]
+            if spec["kind"] == "category" and categorical:
+                codes, categories = self.codes(name)
+                data[name] = pd.Categorical.from_codes(np.asarray(codes), categories=categories)
+            elif spec["kind"] == "string" or spec["kind"] == "category":
+                values = self.column(name)
+                data[name] = pd.Series(values.tolist() if spec["kind"] == "string" else values, dtype=object)
+            else:
+                data[name] = np.asarray(self.arrays[name])
+        return pd.DataFrame(data)
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+
+# Function to open the store of a CSV file, or return None when it is missing or older than the CSV
+def open_store(csv_path, columns=None, store_dir=STORE_DIR):
+    path = store_path(csv_path, store_dir)
+    try:
+        store = VerseStore.open(path, columns)
+    except FileNotFoundError:
+        return None
+    if store.manifest["source"] != source_info(csv_path):
+        return None
+    return store
+
+
+# Function to load a verse dataset as a DataFrame, from its store when it is built and
+# up to date and from the CSV otherwise (always, when `store_dir` is None)
+def load_dataframe(csv_path, columns=None, store_dir=STORE_DIR, categorical=True):
+    store = open_store(csv_path, columns, store_dir) if store_dir else None
+    if store is not None:
+        return store.to_dataframe(columns, categorical=categorical)
+    import pandas as pd
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the verse CSV files into columnar stores")
+    parser.add_argument("datasets", nargs="*", default=DATASETS, help="CSV files to convert")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    for csv_path in args.datasets:
+        start = time.perf_counter()
+        path = store_path(csv_path, args.store_dir)
+        manifest = build_store(csv_path, path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        kinds = ", ".join(f"{name} ({spec['kind']})" for name, spec in manifest["columns"].items())
+        print(f"{csv_path}: {manifest['rows']} rows in {time.perf_counter() - start:.2f}s -> '{path}' "
+              f"({size / 1024:.0f} KB, CSV {manifest['source']['size'] / 1024:.0f} KB)")
+        print(f"  {kinds}")
+
+
+if __name__ == "__main__":
+    main()
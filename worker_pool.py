@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+# Raised by submit() when the queue is full
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# Set on a future whose deadline passed before a worker picked it up
+class DeadlineExceeded(Exception):
+    pass
+
+
+# Runs `fn(item)` on a fixed number of worker threads behind a bounded FIFO
+# queue. Every item carries a deadline (a time.monotonic() value); items that
+# are already expired, or whose caller cancelled the future, are dropped
+# before they reach `fn`.
+class BoundedWorkerPool:
+    def __init__(self, fn, workers=2, max_queue_size=64, name="inference"):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        self.fn = fn
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._busy = 0
+
+        # Statistics
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._expired = 0
+        self._cancelled = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._service_time = 0.0
+
+    # Queue an item and return a Future that resolves to fn(item). Raises QueueFull
+    # when the queue already holds max_queue_size items.
+    def submit(self, item, deadline=None):
+        future = Future()
+        with self._cond:
+            self._ensure_started()
+            if len(self._queue) >= self.max_queue_size:
+                self._rejected += 1
+                raise QueueFull(self._retry_after())
+            self._queue.append((item, future, deadline))
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return future
+
+    # Queue an item and wait for its result until the deadline. On timeout the item is
+    # cancelled, so a worker skips it if it is still queued.
+    def __call__(self, item, deadline=None):
+        future = self.submit(item, deadline)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("Request deadline exceeded") from None
+
+    # Seconds a rejected client should wait: the time the workers need to drain the queue
+    def _retry_after(self):
+        mean_service_time = self._service_time / self._completed if self._completed else 0.0
+        return max(1, math.ceil(len(self._queue) * mean_service_time / self.workers))
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "max_queue_size": self.max_queue_size,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "expired": self._expired,
+                "cancelled": self._cancelled,
+                "errors": self._errors,
+                "mean_service_time_ms": self._service_time / self._completed * 1000.0 if self._completed else 0.0,
+            }
+
+    # Worker threads are started lazily so that a process forked after the pool
+    # was created starts its own workers on first use.
+    def _ensure_started(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_item(self):
+        with self._cond:
+            while True:
+                while not self._queue:
+                    self._cond.wait()
+                item, future, deadline = self._queue.popleft()
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._expired += 1
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(DeadlineExceeded("Request deadline expired in the queue"))
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    self._cancelled += 1
+                    continue
+                self._busy += 1
+                return item, future
+
+    def _run(self):
+        while True:
+            item, future = self._next_item()
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as exc:
+                future.set_exception(exc)
+                failed = True
+            else:
+                future.set_result(result)
+                failed = False
+
+            with self._cond:
+                self._busy -= 1
+                self._completed += 1
+                self._errors += int(failed)
+                self._service_time += time.perf_counter() - start